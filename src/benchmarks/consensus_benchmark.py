@@ -0,0 +1,73 @@
+"""
+Wall time of multi-model consensus translation against in-process fake
+model endpoints with different latencies: one model alone, waiting for
+every model, and stopping at the majority (ConsensusDispatcher).
+
+Usage (from src/):
+    python -m benchmarks.consensus_benchmark --chunks 20 --latencies 0.1 0.2 0.3 1.0 1.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from modules.consensus import ConsensusDispatcher
+from modules.latex_to_natural import latex_to_natural
+from modules.llm_dispatcher import LLMDispatcher
+
+
+class FakeModel:
+    """AsyncClient stand-in: answers after 'latency' seconds; 'wrong' is the share of formulas it mistranslates."""
+
+    def __init__(self, latency, wrong=0.0, seed=0):
+        self.latency = latency
+        self.wrong = wrong
+        self.rng = random.Random(seed)
+
+    async def chat(self, model, messages, options=None):
+        await asyncio.sleep(self.latency)
+        symbols = messages[-1]["content"].split("Now translate the following symbols:\n", 1)[1].split("\n")
+        answers = {
+            symbol: f"something else {self.rng.random():.3f}" if self.rng.random() < self.wrong else f"the symbol {symbol}"
+            for symbol in symbols
+        }
+        return {"message": {"content": json.dumps(answers)[1:-1]}}
+
+
+def _dispatchers(latencies, wrong):
+    return [
+        LLMDispatcher(model=f"fake-{i}", client=FakeModel(latency, wrong if i == len(latencies) - 1 else 0.0, seed=i))
+        for i, latency in enumerate(latencies)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--latencies", type=float, nargs="+", default=[0.1, 0.2, 0.3, 1.0, 1.5])
+    parser.add_argument("--wrong", type=float, default=0.05, help="error rate of the slowest model")
+    args = parser.parse_args()
+
+    latex = [f"x_{{{i}}}^{{2}}" for i in range(args.chunks * args.chunk_size)]
+    print(f"{'mode':>10} {'seconds':>9} {'translated':>11} {'cancelled':>10} {'review':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, quorum in (("fastest", None), ("all", len(args.latencies)), ("majority", None)):
+            dispatchers = _dispatchers(args.latencies, args.wrong)
+            if label == "fastest":
+                dispatchers = dispatchers[:1]
+            consensus = ConsensusDispatcher(dispatchers, quorum=quorum, review_path=os.path.join(workdir, f"{label}.jsonl"))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                translated = latex_to_natural(latex, args.chunk_size, consensus=consensus)
+            elapsed = time.perf_counter() - start
+            print(f"{label:>10} {elapsed:>9.3f} {len(translated):>11} {consensus.cancelled:>10} {len(consensus.review):>7}")
+
+
+if __name__ == "__main__":
+    main()
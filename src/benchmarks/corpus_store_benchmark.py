@@ -0,0 +1,95 @@
+"""
+Read back a split corpus from the per-section text files of save_contents
+and from the single-file corpus store: full scan and random section access.
+
+Usage (from src/):
+    python -m benchmarks.corpus_store_benchmark --books 20 --pages 500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.corpus_store import CorpusReader, corpus_path, corpus_root, save_corpus
+from modules.save_contents import document_dirname, save_contents, section_paths
+from modules.split_contents import split_document
+
+
+def _corpus(books, pages):
+    documents = []
+    for i in range(books):
+        document = Document(name=f"book_{i:03d}", path="")
+        texts = book_page_texts(pages, seed=i)
+        document.pages = [Page(parent_document=document, content=text) for text in texts]
+        documents.append(split_document(document))
+    return documents
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    documents = _corpus(args.books, args.pages)
+    with tempfile.TemporaryDirectory() as artifacts:
+        save_contents(documents, artifacts)
+        save_corpus(documents, artifacts)
+        content_root = os.path.join(artifacts, "content_extraction")
+
+        start = time.perf_counter()
+        files_chars = 0
+        for directory, _, names in os.walk(content_root):
+            for name in names:
+                if name != "full.txt":
+                    files_chars += len(_read(os.path.join(directory, name)))
+        files_scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corpus_chars = 0
+        for document in documents:
+            with CorpusReader(corpus_path(corpus_root(artifacts), document.name)) as reader:
+                corpus_chars += len(reader.orphan_contents())
+                corpus_chars += sum(len(content) for _, content in reader.iter_sections())
+        corpus_scan = time.perf_counter() - start
+
+        rng = random.Random(0)
+        targets = []
+        for _ in range(args.lookups):
+            document = rng.choice(documents)
+            section, path = rng.choice(section_paths(document))
+            targets.append((document, section, path))
+
+        start = time.perf_counter()
+        for document, _, path in targets:
+            _read(os.path.join(content_root, document_dirname(document.name), path))
+        files_lookup = time.perf_counter() - start
+
+        readers = {
+            document.name: CorpusReader(corpus_path(corpus_root(artifacts), document.name))
+            for document in documents
+        }
+        start = time.perf_counter()
+        for document, section, _ in targets:
+            readers[document.name].section(section.position)
+        corpus_lookup = time.perf_counter() - start
+        for reader in readers.values():
+            reader.close()
+
+    print(f"{'backend':>8} {'scan s':>8} {'chars':>11} {'lookup us':>10}")
+    print(f"{'files':>8} {files_scan:>8.3f} {files_chars:>11} {files_lookup / args.lookups * 1e6:>10.1f}")
+    print(f"{'corpus':>8} {corpus_scan:>8.3f} {corpus_chars:>11} {corpus_lookup / args.lookups * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Near-duplicate detection on a synthetic library where some books are
+reprints of others (a share of their words replaced): recall and precision
+of the duplicate pages found, pages/second, and the signature comparisons
+LSH makes against comparing every pair of pages.
+
+Usage (from src/):
+    python -m benchmarks.dedup_benchmark --books 20 --reprints 10 --pages 200 --noise 0.02
+"""
+import argparse
+import random
+import time
+
+from benchmarks.synthetic_corpus import WORDS, book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.dedup import Duplicates, similarity
+from modules.split_contents import split_document
+
+
+def _reprint(text, noise, rng):
+    # replace a share of the words, keeping the line structure
+    return "\n".join(
+        " ".join(rng.choice(WORDS) if rng.random() < noise else word for word in line.split(" "))
+        for line in text.split("\n")
+    )
+
+
+def _library(books, reprints, pages, noise):
+    rng = random.Random(0)
+    texts = {f"book_{i:03d}": book_page_texts(pages, seed=i, formula_rate=0.3) for i in range(books)}
+    originals = {}
+    for j in range(reprints):
+        source = f"book_{rng.randrange(books):03d}"
+        name = f"reprint_{j:03d}"
+        texts[name] = [_reprint(text, noise, rng) for text in texts[source]]
+        originals[name] = source
+
+    documents = []
+    for name, pages_text in texts.items():
+        document = Document(name=name, path="")
+        document.pages = [Page(parent_document=document, content=text) for text in pages_text]
+        documents.append(split_document(document))
+    return documents, originals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--reprints", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.02, help="share of words changed in a reprint")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args()
+
+    documents, originals = _library(args.books, args.reprints, args.pages, args.noise)
+    duplicates = Duplicates(args.threshold)
+    start = time.perf_counter()
+    for document in documents:
+        duplicates.add_document(document)
+    elapsed = time.perf_counter() - start
+
+    expected = {
+        (name, i)
+        for name in originals
+        for i, page in enumerate(next(d for d in documents if d.name == name).pages)
+        if duplicates.page_finder.hasher.signature(page.content) is not None
+    }
+    found = set(duplicates.pages)
+    correct = sum(1 for key in found if key in expected and duplicates.pages[key] == (originals[key[0]], key[1]))
+    pages = sum(len(document.pages) for document in documents)
+    signed = len(duplicates.page_finder.signatures) + len(found)
+    report = duplicates.report()
+
+    print(f"pages {pages}, near-duplicate pages expected {len(expected)}, found {len(found)}")
+    print(f"recall {correct / len(expected) if expected else 1:.3f}, precision {correct / len(found) if found else 1:.3f}")
+    print(f"pages+sections fingerprinted in {elapsed:.2f}s ({pages / elapsed:.0f} pages/s incl. sections)")
+    print(f"page comparisons: LSH {duplicates.page_finder.compared}, all pairs {signed * (signed - 1) // 2}")
+    print(f"sections: {report['sections']['duplicates']}/{report['sections']['total']} duplicates, chars saved {report['chars_saved']}")
+    print(f"LLM work saved: {report['llm_saved']['formulas']} formulas, ~{report['llm_saved']['calls']} requests")
+
+    # brute force on the same signatures, for the time of the candidate search alone
+    signatures = [
+        duplicates.page_finder.hasher.signature(page.content)
+        for document in documents
+        for page in document.pages
+    ]
+    signatures = [signature for signature in signatures if signature is not None]
+    start = time.perf_counter()
+    for i, signature in enumerate(signatures):
+        for other in signatures[:i]:
+            similarity(signature, other)
+    print(f"all-pairs similarity over {len(signatures)} signatures: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Submit every book of a synthetic corpus to the job server at once and
+measure the acknowledgement latency of POST /jobs and the time until the
+last job completes, for each number of workers.
+
+Usage (from src/):
+    python -m benchmarks.job_server_benchmark --books 8 --pages 300 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic_corpus import generate_corpus
+from server import JobServer
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), content
+
+
+async def _run(config, books, workers):
+    server = JobServer(config, workers=workers)
+    await server.start(port=0)
+    try:
+        started = time.perf_counter()
+        acks = []
+
+        async def submit(book):
+            sent = time.perf_counter()
+            status, content = await _request(server.port, "POST", "/jobs", {"book": book})
+            acks.append(time.perf_counter() - sent)
+            assert status == 202, content
+            return json.loads(content)["id"]
+
+        ids = await asyncio.gather(*(submit(book) for book in books))
+        # follow one job's live events to the end, then wait for the rest
+        status, stream = await _request(server.port, "GET", f"/jobs/{ids[-1]}/events")
+        assert status == 200 and b'"stage": "job", "event": "completed"' in stream, stream[-400:]
+        await asyncio.gather(*(server.jobs[job_id].done.wait() for job_id in ids))
+        elapsed = time.perf_counter() - started
+        failed = [job_id for job_id in ids if server.jobs[job_id].status != "completed"]
+        return acks, elapsed, failed
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = os.path.join(workdir, "data")
+        books = generate_corpus(corpus, args.books, args.pages)
+        print(f"{'workers':>8} {'ack p50 ms':>11} {'ack max ms':>11} {'seconds':>9} {'books/s':>8} {'failed':>7}")
+        for workers in args.workers:
+            config = {
+                "data": {"extensions": ["md"], "documents_path": corpus},
+                "artifacts_path": os.path.join(workdir, f"artifacts_{workers}"),
+                "max_workers": 1,
+            }
+            with contextlib.redirect_stdout(io.StringIO()):
+                acks, elapsed, failed = asyncio.run(_run(config, books, workers))
+            print(
+                f"{workers:>8} {statistics.median(acks) * 1000:>11.1f} {max(acks) * 1000:>11.1f} "
+                f"{elapsed:>9.2f} {len(books) / elapsed:>8.2f} {len(failed):>7}"
+            )
+    print(f"CPUs: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main()
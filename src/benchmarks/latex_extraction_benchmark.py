@@ -0,0 +1,89 @@
+"""
+Compare LaTeX extraction strategies on one book: the original recursive
+pylatexenc walk, the iterative walker, and the regex fast path.
+
+Usage (from src/):
+    python -m benchmarks.latex_extraction_benchmark --pages 500 --formula-rate 0.3
+    python -m benchmarks.latex_extraction_benchmark --path ../data/SomeBook
+"""
+import argparse
+import os
+import time
+
+from pylatexenc.latexwalker import LatexWalker, LatexMathNode, LatexMacroNode
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.latex_verification import _regex_spans, extract_page_latex
+from modules.text_extraction import _read_page, _scan_page_files
+
+
+def recursive_extraction(text):
+    # The original extract_latex_from_doc, kept here as the reference point
+    nodes, _, _ = LatexWalker(text).get_latex_nodes()
+    math_expressions = []
+    macro_expressions = []
+
+    def walk(node):
+        if isinstance(node, LatexMathNode):
+            math_expressions.append("".join(child.latex_verbatim() for child in getattr(node, "nodelist", [])))
+        elif isinstance(node, LatexMacroNode):
+            if node.nodeargd:
+                args = "".join(arg.latex_verbatim() for arg in node.nodeargd.argnlist if arg)
+                macro_expressions.append(f"\\{node.macroname}{args}")
+            else:
+                macro_expressions.append(f"\\{node.macroname}")
+        for child in getattr(node, "nodelist", []) or []:
+            walk(child)
+
+    for node in nodes:
+        walk(node)
+    return math_expressions + macro_expressions
+
+
+def _load_book(path, extensions):
+    document = Document(name=os.path.basename(os.path.normpath(path)), path=path)
+    for entry in _scan_page_files(path, extensions):
+        document.pages.append(Page(parent_document=document, content=_read_page(entry.path)))
+    return document
+
+
+def _synthetic_book(pages, formula_rate):
+    document = Document(name="synthetic", path="")
+    texts = book_page_texts(pages, formula_rate=formula_rate)
+    document.pages = [Page(parent_document=document, content=text) for text in texts]
+    return document
+
+
+def _time(label, document, extract):
+    start = time.perf_counter()
+    found = sum(len(extract(page_index, page.content)) for page_index, page in enumerate(document.pages))
+    elapsed = time.perf_counter() - start
+    pages = len(document.pages)
+    print(f"{label:>10} {elapsed:>9.3f} {pages / elapsed:>10.0f} {found:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", help="book directory with <name>_page_N files (default: synthetic book)")
+    parser.add_argument("--extensions", nargs="+", default=["txt", "md", "mmd"])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--formula-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    if args.path:
+        document = _load_book(args.path, args.extensions)
+    else:
+        document = _synthetic_book(args.pages, args.formula_rate)
+
+    fallback = sum(_regex_spans(page.content) is None for page in document.pages)
+    print(f"{document.name}: {len(document.pages)} pages, {fallback} need the walker")
+    print(f"{'strategy':>10} {'seconds':>9} {'pages/s':>10} {'found':>9}")
+    _time("recursive", document, lambda index, text: recursive_extraction(text))
+    _time("iterative", document, lambda index, text: extract_page_latex(document.id, index, text, fast=False))
+    _time("regex", document, lambda index, text: extract_page_latex(document.id, index, text))
+
+
+if __name__ == "__main__":
+    main()
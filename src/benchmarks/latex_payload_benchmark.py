@@ -0,0 +1,69 @@
+"""
+Bytes pickled per task by extract_latex: whole split Documents (the
+original one-submit-per-document pool) against (doc_id, page_index, text)
+page batches sent with executor.map.
+
+Usage (from src/):
+    python -m benchmarks.latex_payload_benchmark --books 8 --pages 300 --workers 4
+"""
+import argparse
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.latex_verification import extract_latex, extract_latex_from_doc, page_payload_batches
+from modules.split_contents import split_document
+
+
+def document_extract_latex(documents, max_workers):
+    # The original pool, kept here as the reference point
+    latex_contents = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(extract_latex_from_doc, doc) for doc in documents]
+        for future in as_completed(futures):
+            doc_id, content = future.result()
+            latex_contents[doc_id] = content
+    return latex_contents
+
+
+def _corpus(books, pages, formula_rate):
+    documents = []
+    for i in range(books):
+        document = Document(name=f"book_{i:03d}", path="")
+        texts = book_page_texts(pages, seed=i, formula_rate=formula_rate)
+        document.pages = [Page(parent_document=document, content=text) for text in texts]
+        documents.append(split_document(document))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--formula-rate", type=float, default=0.3)
+    parser.add_argument("--pages-per-task", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    documents = _corpus(args.books, args.pages, args.formula_rate)
+
+    document_bytes = [len(pickle.dumps(doc)) for doc in documents]
+    batch_bytes = [len(pickle.dumps(batch)) for batch in page_payload_batches(documents, args.pages_per_task)]
+    print(f"{'payload':>10} {'tasks':>7} {'bytes/task':>12} {'total MB':>9}")
+    print(f"{'document':>10} {len(document_bytes):>7} {sum(document_bytes) // len(document_bytes):>12} {sum(document_bytes) / 1e6:>9.2f}")
+    print(f"{'pages':>10} {len(batch_bytes):>7} {sum(batch_bytes) // len(batch_bytes):>12} {sum(batch_bytes) / 1e6:>9.2f}")
+
+    start = time.perf_counter()
+    before = document_extract_latex(documents, args.workers)
+    middle = time.perf_counter()
+    after = extract_latex(documents, args.workers, args.pages_per_task)
+    end = time.perf_counter()
+    assert before == after, "both pools must extract the same formulas"
+    print(f"document pool: {middle - start:.3f}s, page batches: {end - middle:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cost of verbose logging in split_contents: disabled vs. enabled (to /dev/null).
+
+Usage (from src/):
+    python -m benchmarks.logging_benchmark --pages 2000
+"""
+import argparse
+import contextlib
+import os
+import time
+
+import utils
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.split_contents import split_document
+
+
+def _split_time(texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        document = Document(name="synthetic", path="")
+        document.pages = [Page(parent_document=document, content=text) for text in texts]
+        start = time.perf_counter()
+        split_document(document)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = book_page_texts(args.pages)
+
+    utils.set_verbose(False)
+    off = _split_time(texts, args.repeat)
+
+    utils.set_verbose(True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        on = _split_time(texts, args.repeat)
+    utils.set_verbose(False)
+
+    print(f"pages: {args.pages}")
+    print(f"verbose off: {off:.3f}s")
+    print(f"verbose on (stdout -> /dev/null): {on:.3f}s")
+    print(f"logging overhead when enabled: {(on - off) / off * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Memory held by the model objects of a split corpus, compared with the
+previous dict-backed models (uuid4 string ids, attributes added at runtime).
+
+Usage (from src/):
+    python -m benchmarks.models_memory_benchmark --books 20 --pages 500
+"""
+import argparse
+import gc
+import tracemalloc
+import uuid
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.chapter import Chapter
+from models.document import Document
+from models.page import Page
+from models.section import Section
+from modules.split_contents import split_document
+
+
+class LegacyDocument:
+    def __init__(self, name, path):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.path = path
+        self.chapters = []
+        self.sections = []
+        self.pages = []
+
+
+class LegacyChapter:
+    def __init__(self, source_document, name):
+        self.name = name
+        self.source_document = source_document
+        self.sections = []
+        self.pages = []
+
+
+class LegacySection:
+    def __init__(self, source_chapter, source_document, name=""):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.source_chapter = source_chapter
+        self.source_document = source_document
+        self.content = ""
+        self.pages = []
+
+
+class LegacyPage:
+    def __init__(self, parent_document, content):
+        self.parent_document = parent_document
+        self.content = content
+
+
+def _copy(document, document_cls, chapter_cls, section_cls, page_cls):
+    # Same tree shape and the same (shared) strings, rebuilt with the given classes
+    copy = document_cls(document.name, document.path)
+    copy.orphan_contents = list(document.orphan_contents)
+    copy.orphan_sections = []
+    pages = {}
+    for page in document.pages:
+        pages[page] = page_cls(copy, page.content)
+        copy.pages.append(pages[page])
+    chapters = {}
+    for chapter in document.chapters:
+        chapters[chapter] = chapter_cls(copy, chapter.name)
+        chapters[chapter].pages = [pages[p] for p in chapter.pages]
+        copy.chapters.append(chapters[chapter])
+    sections = {}
+    for section in document.sections:
+        new = section_cls(chapters.get(section.source_chapter), copy, section.name)
+        new.content = section.content
+        new.pages = [pages[p] for p in section.pages]
+        sections[section] = new
+        copy.sections.append(new)
+    for section, new in sections.items():
+        if section.subsections:
+            new.subsections = [sections[s] for s in section.subsections]
+    for chapter, new in chapters.items():
+        new.sections = [sections[s] for s in chapter.sections]
+    return copy
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used, objects
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    texts = [book_page_texts(args.pages, seed=i) for i in range(args.books)]
+    # page strings are shared by both variants; only the model overhead is measured
+    documents = []
+    for i, book in enumerate(texts):
+        document = Document(name=f"book_{i}", path="")
+        document.pages = [Page(parent_document=document, content=text) for text in book]
+        documents.append(split_document(document))
+    for document in documents:
+        for section in document.sections:
+            section.content  # join once so both variants share the same string
+
+    def build_current():
+        return [_copy(d, Document, Chapter, Section, Page) for d in documents]
+
+    def build_legacy():
+        return [
+            _copy(d, LegacyDocument, LegacyChapter, LegacySection, LegacyPage)
+            for d in documents
+        ]
+
+    current, current_objects = _measure(build_current)
+    legacy, legacy_objects = _measure(build_legacy)
+
+    sections = sum(len(d.sections) for d in documents)
+    pages = sum(len(d.pages) for d in documents)
+    print(f"objects: {args.books} documents, {pages} pages, {sections} sections")
+    print(f"legacy models: {legacy / 1e6:.2f} MB ({legacy / (pages + sections):.0f} B/object)")
+    print(f"slotted models: {current / 1e6:.2f} MB ({current / (pages + sections):.0f} B/object)")
+    print(f"saved: {(legacy - current) / 1e6:.2f} MB ({(legacy - current) / legacy * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
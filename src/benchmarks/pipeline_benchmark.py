@@ -0,0 +1,172 @@
+"""
+Run the pipeline stages on a synthetic Nougat corpus and record, per stage,
+wall time, pages/second and peak RSS into a JSON report tagged with the git
+commit, so runs can be compared across commits.
+
+The peak RSS of each stage is measured on its own: on Linux the process
+high-water mark (VmHWM) is reset through /proc/self/clear_refs before the
+stage starts. Where that is not available the report falls back to
+ru_maxrss, the peak of the whole run so far, and says so in
+"peak_rss_scope". Worker processes are reported through ru_maxrss of the
+finished children, which only tells the stage apart when its largest
+worker is larger than every earlier one; otherwise it is null.
+
+Usage (from src/):
+    python -m benchmarks.pipeline_benchmark --books 10 --pages 300 --output before.json
+    python -m benchmarks.pipeline_benchmark --books 10 --pages 300 --output after.json --compare before.json
+    python -m benchmarks.pipeline_benchmark --section-every 2 --formula-rate 0.4 --workers 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_corpus import generate_corpus
+from modules.save_contents import save_contents
+from modules.split_contents import split_contents
+from modules.text_extraction import text_extraction
+
+try:
+    from modules.latex_verification import extract_formulas
+except ImportError as e:  # pylatexenc missing: the stage is reported as skipped
+    extract_formulas = None
+    LATEX_IMPORT_ERROR = repr(e)
+
+
+def _git(*args):
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _reset_peak_rss():
+    """Reset this process's VmHWM to its current RSS; False where the kernel does not allow it."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def _stage_peak_rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / (1 << 10), 1)
+    return None
+
+
+def _run_stage(report, name, pages, stage):
+    per_stage = _reset_peak_rss()
+    children_before = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = stage()
+    seconds = time.perf_counter() - started
+    children_peak = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    entry = {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "pages": pages,
+        "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+        "peak_rss_mb": _stage_peak_rss_mb() if per_stage else _peak_rss_mb(),
+        "peak_rss_scope": "stage" if per_stage else "run",
+        "children_peak_rss_mb": children_peak if children_peak > children_before else None,
+    }
+    report["stages"].append(entry)
+    children = f"{children_peak:>9.1f}" if entry["children_peak_rss_mb"] is not None else f"{'-':>9}"
+    print(f"{name:>16} {entry['seconds']:>9.3f} {entry['pages_per_sec'] or 0:>10.0f} {entry['peak_rss_mb']:>9.1f} {children}")
+    return result
+
+
+def _compare(report, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {entry["stage"]: entry for entry in previous.get("stages", [])}
+    print(f"\nvs {previous_path} ({(previous.get('commit') or '?')[:10]}):")
+    for entry in report["stages"]:
+        old = before.get(entry["stage"])
+        if old is None or not old.get("seconds") or entry.get("skipped"):
+            continue
+        change = (entry["seconds"] - old["seconds"]) / old["seconds"] * 100
+        print(f"{entry['stage']:>16} {old['seconds']:>9.3f} -> {entry['seconds']:>9.3f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--chapter-every", type=int, default=20, help="pages per '##' chapter (0: none)")
+    parser.add_argument("--section-every", type=int, default=4, help="pages per '#' section (0: none)")
+    parser.add_argument("--formula-rate", type=float, default=0.2, help="fraction of lines with a formula")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--output", default=os.path.join(tempfile.gettempdir(), "pipeline_benchmark.json"),
+        help="report path (default: pipeline_benchmark.json in the system temp directory)",
+    )
+    parser.add_argument("--compare", help="previous report to compare stage times against")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": vars(args),
+        "stages": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = os.path.join(workdir, "data")
+        artifacts = os.path.join(workdir, "artifacts")
+        generate_corpus(
+            corpus, args.books, args.pages,
+            chapter_every=args.chapter_every,
+            section_every=args.section_every,
+            formula_rate=args.formula_rate,
+        )
+        pages = args.books * args.pages
+
+        print(f"{'stage':>16} {'seconds':>9} {'pages/s':>10} {'rss MB':>9} {'child MB':>9}")
+        documents = _run_stage(report, "text_extraction", pages, lambda: text_extraction(["md"], corpus, max_workers=args.workers))
+        documents = _run_stage(report, "split_contents", pages, lambda: split_contents(documents, max_workers=args.workers))
+        _run_stage(report, "save_contents", pages, lambda: save_contents(documents, artifacts, max_workers=args.workers))
+        if extract_formulas is not None:
+            formulas = _run_stage(report, "extract_latex", pages, lambda: extract_formulas(documents, max_workers=args.workers))
+            report["formulas"] = len(formulas)
+        else:
+            report["stages"].append({"stage": "extract_latex", "skipped": LATEX_IMPORT_ERROR})
+            print(f"{'extract_latex':>16} omitido: {LATEX_IMPORT_ERROR}")
+
+    # before saving: the previous report may be the one about to be overwritten
+    if args.compare:
+        _compare(report, args.compare)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Reporte guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Check that split_contents scales linearly with book length.
+
+Usage (from src/):
+    python -m benchmarks.split_contents_benchmark --pages 5000
+    python -m benchmarks.split_contents_benchmark --pages 5000 --single-section
+"""
+import argparse
+import time
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.split_contents import split_document
+
+
+def _build_document(texts):
+    document = Document(name="synthetic", path="")
+    document.pages = [Page(parent_document=document, content=text) for text in texts]
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument(
+        "--single-section", action="store_true",
+        help="one chapter and one section for the whole book (worst case for accumulation)",
+    )
+    args = parser.parse_args()
+
+    chapter_every, section_every = (0, 0) if args.single_section else (20, 4)
+    texts = book_page_texts(args.pages, chapter_every=chapter_every, section_every=section_every)
+    if args.single_section:
+        texts[0] = "## Chapter 1\n\n# Section 1\n\n" + texts[0]
+
+    print(f"{'pages':>8} {'seconds':>9} {'us/page':>9}")
+    for fraction in (0.125, 0.25, 0.5, 1.0):
+        count = int(args.pages * fraction)
+        document = _build_document(texts[:count])
+        start = time.perf_counter()
+        split_document(document)
+        for section in document.sections:
+            section.content
+        elapsed = time.perf_counter() - start
+        print(f"{count:>8} {elapsed:>9.3f} {elapsed / count * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
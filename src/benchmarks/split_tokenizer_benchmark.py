@@ -0,0 +1,100 @@
+"""
+Lines per second of paragraph splitting: the per-line loop split_contents
+used before (splitlines, strip, HEADING_RE and normalize_joined_paragraph
+per line) against the whole-page tokenizer (tokenize_page and
+normalize_paragraph_text). Both must produce the same paragraphs.
+
+Usage (from src/):
+    python -m benchmarks.split_tokenizer_benchmark --pages 5000
+"""
+import argparse
+import re
+import time
+from typing import List
+
+from benchmarks.synthetic_corpus import book_page_texts
+from modules.split_contents import HEADING_RE, normalize_paragraph_text, tokenize_page
+
+
+def normalize_joined_paragraph(lines: List[str]) -> str:
+    # The paragraph joiner split_contents used per line, kept here as the reference point
+    """
+    Join a list of lines into a normalized paragraph string.
+    - Remove leading/trailing whitespace per line.
+    - If a line ends with a hyphen (word-split), join without hyphen and without extra space.
+    - Otherwise join lines with single spaces.
+    - Collapse multiple internal whitespace into single spaces.
+    """
+    if not lines:
+        return ""
+    joined_parts: List[str] = []
+    for i, raw in enumerate(lines):
+        s = raw.strip()
+        if not s:
+            continue
+        if joined_parts and joined_parts[-1].endswith("-"):
+            # remove trailing hyphen and join directly
+            joined_parts[-1] = joined_parts[-1][:-1] + s
+        else:
+            joined_parts.append(s)
+    # join with spaces and collapse multiple spaces
+    text = " ".join(joined_parts)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def per_line(pages):
+    paragraphs, buffer = [], []
+    for text in pages:
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped or HEADING_RE.match(stripped):
+                if buffer:
+                    paragraphs.append(normalize_joined_paragraph(buffer))
+                    buffer = []
+                continue
+            buffer.append(line)
+    if buffer:
+        paragraphs.append(normalize_joined_paragraph(buffer))
+    return paragraphs
+
+
+def whole_page(pages):
+    paragraphs, buffer = [], []
+    for text in pages:
+        for kind, start, end in tokenize_page(text):
+            if kind == "text":
+                buffer.append(text[start:end])
+                if text[end - 1] != "\n":
+                    buffer.append("\n")
+            elif buffer:
+                paragraphs.append(normalize_paragraph_text("".join(buffer)))
+                buffer = []
+    if buffer:
+        paragraphs.append(normalize_paragraph_text("".join(buffer)))
+    return paragraphs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = book_page_texts(args.pages, seed=0)
+    lines = sum(text.count("\n") + 1 for text in pages)
+    results = {}
+    print(f"{'splitter':>10} {'seconds':>9} {'lines/s':>12} {'paragraphs':>11}")
+    for label, split in (("per-line", per_line), ("tokenizer", whole_page)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[label] = split(pages)
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:>10} {best:>9.3f} {lines / best:>12.0f} {len(results[label]):>11}")
+    if results["per-line"] != results["tokenizer"]:
+        raise SystemExit("Los párrafos no coinciden")
+
+
+if __name__ == "__main__":
+    main()
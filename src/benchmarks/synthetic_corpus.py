@@ -0,0 +1,95 @@
+import os
+import random
+from typing import List
+
+WORDS = (
+    "let be a function the set of all points such that for every there exists "
+    "we define limit continuous derivative integral sequence converges group ring "
+    "field vector space linear map matrix theorem proof follows hence therefore"
+).split()
+FORMULAS = (
+    "$x$", "$\\pi$", "$\\infty$", "$f(x)$", "$x \\leq y$", "$\\alpha_n \\to 0$",
+    "$\\frac{a}{b}$", "$\\sum_{i=1}^{n} x_i^2$", "\\(\\mathbb{R}^n\\)",
+    "$$\\int_a^b f(x) \\, dx = F(b) - F(a)$$", "\\[\\lim_{n \\to \\infty} a_n = L\\]",
+)
+
+
+def _line(rng: random.Random, formula_rate: float) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(8, 14))]
+    if formula_rate and rng.random() < formula_rate:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FORMULAS))
+    return " ".join(words)
+
+
+def _paragraph(rng: random.Random, lines: int, formula_rate: float = 0.0) -> str:
+    return "\n".join(_line(rng, formula_rate) for _ in range(lines))
+
+
+def book_page_texts(
+    pages: int,
+    seed: int = 0,
+    chapter_every: int = 20,
+    section_every: int = 4,
+    formula_rate: float = 0.0,
+) -> List[str]:
+    """
+    Page texts of a synthetic Nougat book: a '##' chapter every 'chapter_every'
+    pages and a '#' section every 'section_every' pages (0 disables them).
+    With a formula_rate, that fraction of the lines carries a LaTeX formula.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for number in range(1, pages + 1):
+        blocks = []
+        if chapter_every and number % chapter_every == 1 % chapter_every:
+            blocks.append(f"## Chapter {number // chapter_every + 1}")
+        if section_every and number % section_every == 1 % section_every:
+            blocks.append(f"# Section {number // section_every + 1}")
+        for _ in range(rng.randint(3, 6)):
+            blocks.append(_paragraph(rng, rng.randint(2, 6), formula_rate))
+        texts.append("\n\n".join(blocks) + "\n")
+    return texts
+
+
+def generate_book(
+    path: str,
+    name: str,
+    pages: int,
+    seed: int = 0,
+    chapter_every: int = 20,
+    section_every: int = 4,
+    formula_rate: float = 0.0,
+) -> List[str]:
+    """
+    Write a synthetic book in the Nougat layout text_extraction expects:
+    <path>/<name>/<name>_page_N.md, with '##' chapters and '#' sections
+    (densities as in book_page_texts).
+    """
+    book_dir = os.path.join(path, name)
+    os.makedirs(book_dir, exist_ok=True)
+
+    written = []
+    for number, text in enumerate(book_page_texts(pages, seed, chapter_every, section_every, formula_rate), start=1):
+        page_path = os.path.join(book_dir, f"{name}_page_{number}.md")
+        with open(page_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        written.append(page_path)
+    return written
+
+
+def generate_corpus(
+    path: str,
+    books: int,
+    pages: int,
+    seed: int = 0,
+    chapter_every: int = 20,
+    section_every: int = 4,
+    formula_rate: float = 0.0,
+) -> List[str]:
+    """Write 'books' synthetic books of 'pages' pages each under path."""
+    names = []
+    for i in range(books):
+        name = f"book_{i:03d}"
+        generate_book(path, name, pages, seed + i, chapter_every, section_every, formula_rate)
+        names.append(name)
+    return names
@@ -0,0 +1,88 @@
+"""
+Compare the threaded page loader against the original sequential loop.
+
+Usage (from src/):
+    python -m benchmarks.text_extraction_benchmark --books 20 --pages 300
+    python -m benchmarks.text_extraction_benchmark --latency-ms 2 --workers 16
+    python -m benchmarks.text_extraction_benchmark --path /mnt/corpus --workers 16
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from benchmarks.synthetic_corpus import generate_corpus
+from models.document import Document
+from models.page import Page
+from modules import text_extraction as text_extraction_module
+from modules.text_extraction import _read_page, text_extraction
+
+
+def sequential_text_extraction(document_types, documents_path, read_page=_read_page):
+    # The original single-threaded loop, kept here as the reference point
+    documents = []
+    for document in os.listdir(documents_path):
+        document_path = os.path.join(documents_path, document)
+        if not os.path.isdir(document_path):
+            continue
+        current_document = Document(name=document, path=document_path)
+        page_files = [
+            f for f in os.listdir(document_path)
+            if f.split(".")[-1] in document_types
+        ]
+        page_files.sort(key=lambda x: int(re.search(r'_page_(\d+)', x).group(1)))
+        for page_file in page_files:
+            content = read_page(os.path.join(document_path, page_file))
+            current_document.pages.append(Page(parent_document=current_document, content=content))
+        documents.append(current_document)
+    return documents
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", help="existing corpus; a synthetic one is generated otherwise")
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--extensions", nargs="+", default=["txt", "md", "json"])
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0,
+        help="simulated per-file read latency, to model a network-mounted corpus",
+    )
+    args = parser.parse_args()
+
+    read_page = _read_page
+    if args.latency_ms:
+        def read_page(page_path):
+            time.sleep(args.latency_ms / 1000)
+            return _read_page(page_path)
+        text_extraction_module._read_page = read_page
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = tmp
+            generate_corpus(path, args.books, args.pages)
+
+        seq_time, seq_docs = _timed(sequential_text_extraction, args.extensions, path, read_page)
+        par_time, par_docs = _timed(text_extraction, args.extensions, path, max_workers=args.workers)
+
+        pages = sum(len(d.pages) for d in seq_docs)
+        same = [[p.content for p in d.pages] for d in seq_docs] == [
+            [p.content for p in d.pages] for d in par_docs
+        ]
+        print(f"pages: {pages}, identical output: {same}")
+        print(f"sequential: {seq_time:.3f}s ({pages / seq_time:,.0f} pages/s)")
+        print(f"threaded ({args.workers} workers): {par_time:.3f}s ({pages / par_time:,.0f} pages/s)")
+        print(f"speedup: {seq_time / par_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
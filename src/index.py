@@ -1,22 +1,177 @@
 import json
 import os
+import sys
+import time
 
 # Importar la configuración
 config = json.load(open("config.json", "r"))
 
 # Importar los modelos
 from models.document import Document
+from models.page import PageCache
 
 # Importar utilidades
-from utils import verbose_print
+from utils import log_event, verbose_print
 
 # Importar las etapas del procesamiento
-from modules.text_extraction import text_extraction
-from modules.split_contents import split_contents
-from modules.save_contents import save_contents
+from modules.text_extraction import iter_text_extraction, text_extraction
+from modules.split_contents import iter_split_contents, split_contents
+from modules.save_contents import iter_save_contents, save_contents
+from modules.content_classification import iter_classify_contents, classify_contents
+from modules.manifest import Manifest
+from modules.convert_to_json import EXTENSIONS as JSON_EXTENSIONS, iter_convert_to_json, convert_to_json
+from modules.corpus_store import EXTENSION as CORPUS_EXTENSION, corpus_root, iter_save_corpus, save_corpus
+from modules.dedup import Duplicates, find_duplicates, iter_find_duplicates
 
-# from modules.extract_latex import extract_latex
-# from modules.latex_to_natural import latex_to_natural
+# from modules.latex_verification import iter_section_formulas
+# from modules.formula_index import FormulaIndex
+# from modules.inject_latex import inject_document
+# from modules.latex_to_natural import PROMPT_VERSION, latex_to_natural, make_dispatcher
+# from modules.translation_cache import TranslationCache
+# from modules.consensus import make_consensus
+# from modules.symbol_dictionary import SymbolDictionary
+
+
+def _page_cache():
+    # Solo se usa cuando "lazy_pages" está activo
+    return PageCache(config.get("page_cache_size", 256))
+
+
+def _corpus_backend():
+    # "files": un .txt por sección (por defecto); "corpus": un archivo binario por libro
+    return config.get("artifact_backend", "files") == "corpus"
+
+
+def _manifest():
+    # Solo con "incremental": los libros sin cambios desde la última ejecución se omiten
+    if not config.get("incremental", False) or "--full" in sys.argv:
+        return None
+    # cada salida activada debe existir, y las opciones que cambian las salidas deben coincidir
+    if _corpus_backend():
+        outputs = [(corpus_root(config["artifacts_path"]), CORPUS_EXTENSION)]
+    else:
+        outputs = [(os.path.join(config["artifacts_path"], "content_extraction"), "")]
+    json_enabled, json_compression = _json_export()
+    if json_enabled:
+        outputs.append((os.path.join(config["artifacts_path"], "json"), JSON_EXTENSIONS[json_compression]))
+    options = {
+        "artifact_backend": config.get("artifact_backend", "files"),
+        "classify_contents": config.get("classify_contents", False),
+        "json_export": json_compression if json_enabled else None,
+    }
+    return Manifest(os.path.join(config["artifacts_path"], "manifest.json"), outputs, options)
+
+
+def _dedup():
+    # Etapa 2.3: páginas y secciones casi duplicadas entre libros (ediciones, reimpresiones)
+    dedup = config.get("dedup", {})
+    return dedup.get("enabled", False), dedup.get("threshold", 0.7)
+
+
+def _dedup_state_path():
+    return os.path.join(config["artifacts_path"], "dedup_state.json")
+
+
+def _load_duplicates(threshold: float, manifest):
+    # En modo incremental se parte de las firmas de los libros ya procesados,
+    # que no se vuelven a leer; sin manifest se procesan todos desde cero
+    if manifest is None:
+        return Duplicates(threshold)
+    return Duplicates.load_state(_dedup_state_path(), threshold)
+
+
+def _save_dedup_report(duplicates: Duplicates):
+    path = os.path.join(config["artifacts_path"], "dedup_report.json")
+    duplicates.save(path)
+    duplicates.save_state(_dedup_state_path())
+    print(f"[Dedup] Reporte guardado en {path}")
+    return duplicates.report()
+
+
+def _flat_report(report: dict) -> dict:
+    # {"pages": {"total": 3}} -> {"pages_total": 3}, for log_event
+    flat = {}
+    for name, value in report.items():
+        if isinstance(value, dict):
+            flat.update({f"{name}_{key}": item for key, item in value.items()})
+        else:
+            flat[name] = value
+    return flat
+
+
+def _json_export():
+    # Etapa 6: un archivo JSON Lines por libro, un registro por sección
+    export = config.get("json_export", {})
+    return export.get("enabled", False), export.get("compression", "gzip")
+
+
+def run_streaming():
+    """
+    Ejecutar las etapas 1 a 2.2 libro por libro: cada documento se carga, se
+    separa y se guarda antes de leer el siguiente, así que la memoria máxima
+    depende del libro más grande y no de toda la biblioteca.
+    """
+    print("Iniciando Etapas 1-2.2 en modo streaming (un libro a la vez)")
+    manifest = _manifest()
+    documents = iter_text_extraction(
+        config["data"]["extensions"],
+        config["data"]["documents_path"],
+        max_workers=config.get("max_workers"),
+        lazy=config.get("lazy_pages", False),
+        page_cache=_page_cache(),
+        book_filter=manifest.needs_processing if manifest else None,
+    )
+    documents = iter_split_contents(documents, max_workers=config.get("max_workers"))
+    if config.get("classify_contents", False):
+        documents = iter_classify_contents(documents)
+    dedup_enabled, dedup_threshold = _dedup()
+    duplicates = _load_duplicates(dedup_threshold, manifest) if dedup_enabled else None
+    if duplicates is not None:
+        documents = iter_find_duplicates(documents, duplicates)
+
+    if _corpus_backend():
+        documents = iter_save_corpus(documents, config["artifacts_path"])
+    else:
+        documents = iter_save_contents(
+            documents, config["artifacts_path"], max_workers=config.get("max_workers")
+        )
+    json_enabled, json_compression = _json_export()
+    if json_enabled:
+        documents = iter_convert_to_json(documents, config["artifacts_path"], json_compression)
+
+    saved = 0
+    started = time.perf_counter()
+    log_event("pipeline", "started", mode="stream")
+    for document in documents:
+        saved += 1
+        print(f"[Pipeline] Documento {saved} completado: {document.name}")
+        if manifest:
+            manifest.mark_processed(document.name)
+            manifest.save()
+        log_event(
+            "pipeline",
+            "document_completed",
+            document=document.name,
+            pages=len(document.pages),
+            chapters=len(document.chapters),
+            sections=len(document.sections),
+        )
+    if manifest:
+        manifest.save()
+    # sin libros nuevos el reporte anterior sigue siendo válido
+    if duplicates is not None and saved:
+        log_event("dedup", "completed", **_flat_report(_save_dedup_report(duplicates)))
+    log_event(
+        "pipeline",
+        "completed",
+        documents=saved,
+        seconds=round(time.perf_counter() - started, 3),
+    )
+
+    print(
+        f"Etapas 1-2.2 completadas. Documentos procesados: {saved}. Puedes encontrar los documentos guardados en: {config['artifacts_path']}"
+    )
+    print("=============================================================")
 
 
 def main():
@@ -27,48 +182,155 @@ def main():
     print("Utilidad De Conversión de Documentos para Evangelizadores IA")
     print("Creado por Fernando Rivera (https://asterkiwebsite.vercel.app)")
     print("Utiliza --verbose para salida detallada")
+    print("Utiliza --stream para procesar los libros uno por uno")
+    print("Utiliza --log-json para emitir eventos JSON por etapa en stderr")
+    print("Utiliza --full para reprocesar todos los libros en modo incremental")
     print("=============================================================")
     print("Cargando configuración desde config.json")
     print(f"Configuración cargada: {config}")
     print("=============================================================")
+
+    if "--stream" in sys.argv or config.get("streaming", False):
+        run_streaming()
+        return
+
     print("Iniciando Etapa 1: Carga de Documentos de Texto")
+    started = time.perf_counter()
+    manifest = _manifest()
     documents: list[Document] = text_extraction(
-        config["data"]["extensions"], config["data"]["documents_path"]
+        config["data"]["extensions"],
+        config["data"]["documents_path"],
+        max_workers=config.get("max_workers"),
+        lazy=config.get("lazy_pages", False),
+        page_cache=_page_cache(),
+        book_filter=manifest.needs_processing if manifest else None,
     )
     print(f"Etapa 1 completada. Documentos cargados: {len(documents)}")
-    verbose_print(f"  Documents: {documents[0:10]}")
+    log_event(
+        "text_extraction",
+        "completed",
+        documents=len(documents),
+        pages=sum(len(document.pages) for document in documents),
+        seconds=round(time.perf_counter() - started, 3),
+    )
+    verbose_print("  Documents: %s", documents[0:10])
     print("=============================================================")
     print(
         "Iniciando Etapa 2.1: Separación de Contenidos en Capítulos, Secciones y Contenidos"
     )
-    documents: list[Document] = split_contents(documents)
+    started = time.perf_counter()
+    documents: list[Document] = split_contents(
+        documents, max_workers=config.get("max_workers")
+    )
     print(f"Etapa 2.1 completada.")
+    log_event(
+        "split_contents",
+        "completed",
+        documents=len(documents),
+        sections=sum(len(document.sections) for document in documents),
+        seconds=round(time.perf_counter() - started, 3),
+    )
     print("=============================================================")
+    if config.get("classify_contents", False):
+        print("Iniciando Clasificación de Contenidos: Párrafo, Definición, Teorema, Ejemplo, ...")
+        started = time.perf_counter()
+        kinds = classify_contents(documents)
+        print("Clasificación completada.")
+        log_event(
+            "classify_contents",
+            "completed",
+            paragraphs=sum(kinds.values()),
+            seconds=round(time.perf_counter() - started, 3),
+            **{f"kind_{kind}": count for kind, count in kinds.items()},
+        )
+        print("=============================================================")
     print("Iniciando Etapa 2.2: Guardado de Documentos con Contenidos Separados")
-    save_contents(documents, config["artifacts_path"])
+    started = time.perf_counter()
+    if _corpus_backend():
+        save_corpus(documents, config["artifacts_path"])
+    else:
+        save_contents(documents, config["artifacts_path"], max_workers=config.get("max_workers"))
     print(
         f"Etapa 2.2 completada. Puedes encontrar los documentos guardados en: {config['artifacts_path']}"
     )
+    log_event(
+        "save_contents",
+        "completed",
+        documents=len(documents),
+        seconds=round(time.perf_counter() - started, 3),
+    )
     print("=============================================================")
 
+    dedup_enabled, dedup_threshold = _dedup()
+    if dedup_enabled and documents:
+        print("Iniciando Etapa 2.3: Detección de Páginas y Secciones Duplicadas")
+        started = time.perf_counter()
+        duplicates = find_duplicates(documents, dedup_threshold, _load_duplicates(dedup_threshold, manifest))
+        report = _save_dedup_report(duplicates)
+        print("Etapa 2.3 completada.")
+        log_event("dedup", "completed", seconds=round(time.perf_counter() - started, 3), **_flat_report(report))
+        print("=============================================================")
+    json_enabled, json_compression = _json_export()
+    if json_enabled:
+        print("Iniciando Etapa 6: Exportación a JSON Lines")
+        started = time.perf_counter()
+        convert_to_json(documents, config["artifacts_path"], json_compression)
+        print(f"Etapa 6 completada. Archivos en: {os.path.join(config['artifacts_path'], 'json')}")
+        log_event(
+            "convert_to_json",
+            "completed",
+            documents=len(documents),
+            seconds=round(time.perf_counter() - started, 3),
+        )
+        print("=============================================================")
+
+    # los libros se registran solo cuando todas sus salidas están escritas
+    if manifest:
+        for document in documents:
+            manifest.mark_processed(document.name)
+        manifest.save()
+
     # return; # Desactivar la ejecución de las etapas por ahora
     #
     # print("Iniciando Etapa 2: Extracción de Contenido LaTeX")
     #
-    # print(text_documents[2:3])
-    # latex_contents = extract_latex(text_documents[2:3], max_workers=config.get("max_workers", None))
-    # print(f"Etapa 2 completada. Documentos con contenido LaTeX extraído: {len(latex_contents)}")
-    # latex_list = []
-    # for doc_id, content in latex_contents.items():
-    #     latex_list.extend(content.get("math", []))
-    #     latex_list.extend(content.get("macros", []))
-    #
-    # # Remove duplicates
-    # latex_list = list(set(latex_list))
+    # # Una entrada por fórmula distinta, con todas sus apariciones (documento/capítulo/sección/página/offset)
+    # index_path = os.path.join(config["artifacts_path"], "formula_index.json")
+    # formula_index = FormulaIndex.load(index_path)
+    # for document in documents:
+    #     formula_index.add_document(document, iter_section_formulas(document))
+    # formula_index.save(index_path)
+    # print(f"Etapa 2 completada. Índice de fórmulas: {formula_index.stats()}")
+    # latex_list = formula_index.formulas
     #
     # print("Iniciando Etapa 3: Conversión de LaTeX a Lenguaje Natural")
-    # latex_contents = latex_to_natural(latex_list[0:20], 20)
+    # # Símbolos simples ($X$, $\pi$, $\infty$) se traducen sin LLM
+    # dictionary = SymbolDictionary.load(config["llm"].get("symbol_tables", ["well-known-latex.json", "latex_symbols_english.txt"]))
+    # # Con varios modelos en config["llm"]["consensus"]["models"], cada lote se traduce por mayoría
+    # consensus_config = config["llm"].get("consensus", {})
+    # consensus = None
+    # if consensus_config.get("models"):
+    #     consensus = make_consensus(
+    #         consensus_config["models"], config["llm"]["host"],
+    #         quorum=consensus_config.get("quorum"), review_path=consensus_config.get("review_path"),
+    #         concurrency=config["llm"]["concurrency"], timeout=config["llm"]["timeout"],
+    #         max_retries=config["llm"]["max_retries"],
+    #     )
+    # # Modelo, host, concurrencia, timeout y reintentos de config["llm"]
+    # dispatcher = make_dispatcher(config["llm"])
+    # # Las fórmulas ya traducidas en ejecuciones anteriores salen de la caché, sin llamar al LLM
+    # cache = TranslationCache(config["llm"]["cache_path"], dispatcher.model, PROMPT_VERSION, config["llm"]["cache_max_entries"])
+    # # Los lotes se llenan hasta config["llm"]["maxTokens"] (prompt + respuesta estimados)
+    # latex_contents = latex_to_natural(
+    #     latex_list[0:20], 20, cache=cache, dispatcher=dispatcher, token_budget=config["llm"]["maxTokens"],
+    #     dictionary=dictionary, consensus=consensus,
+    # )
+    # cache.close()
     # print(f"Etapa 3 completada. Documentos con contenido LaTeX extraído: {len(latex_contents)}")
+    #
+    # print("Iniciando Etapa 5: Reemplazo del LaTeX por Lenguaje Natural")
+    # for document in documents:
+    #     inject_document(document, formula_index, latex_contents, config["artifacts_path"])
 
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@ from models.section import Section
 
 
 class Chapter:
+    __slots__ = ("name", "source_document", "sections", "pages")
+
     def __init__(self, source_document, name):
         self.name = name
 
@@ -14,5 +16,10 @@ class Chapter:
 
         self.pages: list[Page] = []
 
+    def add_page(self, page: Page):
+        # pages are added in reading order, so a page already present is the last one
+        if not self.pages or self.pages[-1] is not page:
+            self.pages.append(page)
+
     def __repr__(self):
         return f"Chapter(name={self.name}, source_document={self.source_document}, sections_count={len(self.sections)}"
@@ -1,13 +1,23 @@
-import uuid
-
 from models.chapter import Chapter
+from models.identifiers import next_id, stable_id
 from models.page import Page
 from models.section import Section
 
 
 class Document:
+    __slots__ = (
+        "id",
+        "name",
+        "path",
+        "chapters",
+        "sections",
+        "pages",
+        "orphan_contents",
+        "orphan_sections",
+    )
+
     def __init__(self, name, path):
-        self.id = str(uuid.uuid4())
+        self.id: int = next_id()
         self.name = name
         self.path = path
 
@@ -17,5 +27,12 @@ class Document:
 
         self.pages: list[Page] = []
 
+        # Filled by split_contents: text and sections found before any chapter
+        self.orphan_contents: list[str] = []
+        self.orphan_sections: list[Section] = []
+
+    def stable_id(self) -> str:
+        return stable_id(self.name)
+
     def __repr__(self):
         return f"Document(id={self.id}, name={self.name}, path={self.path}, pages_count={len(self.pages)}, chapters_count={len(self.chapters)})"
@@ -0,0 +1,29 @@
+class Formula:
+    """
+    A LaTeX fragment found in a page: inline/display math or a macro.
+    'start'/'end' are offsets in the page text (end exclusive, delimiters
+    included); 'line'/'column' are 1-based and point at 'start'.
+    """
+
+    __slots__ = ("doc_id", "page_index", "line", "column", "start", "end", "latex", "kind", "delimiter")
+
+    def __init__(self, doc_id, page_index, line, column, start, end, latex, kind="math", delimiter=""):
+        self.doc_id = doc_id
+        self.page_index: int = page_index
+        self.line: int = line
+        self.column: int = column
+        self.start: int = start
+        self.end: int = end
+        # content without its delimiters
+        self.latex: str = latex
+        # "math" or "macro"
+        self.kind: str = kind
+        # opening delimiter ("$", "$$", "\\[", "\\(") or environment name
+        self.delimiter: str = delimiter
+
+    def __reduce__(self):
+        # positional tuple: much smaller to pickle back from worker processes than slot state
+        return (Formula, tuple(getattr(self, name) for name in Formula.__slots__))
+
+    def __repr__(self):
+        return f"Formula(doc_id={self.doc_id}, page={self.page_index}, line={self.line}, column={self.column}, latex={self.latex!r})"
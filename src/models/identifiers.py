@@ -0,0 +1,21 @@
+import hashlib
+import itertools
+
+# Process-wide counter: ids are cheap ints, unique within one run
+_counter = itertools.count(1)
+
+
+def next_id() -> int:
+    return next(_counter)
+
+
+def stable_id(*parts) -> str:
+    """
+    Short hex digest of the given parts. Unlike next_id() it is the same on
+    every run and in every process, so it can be used in file names and indexes.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
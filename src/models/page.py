@@ -1,11 +1,108 @@
+import mmap
+from collections import OrderedDict
+from typing import Optional
+
+
 class Page:
-    def __init__(self, parent_document, content):
+    __slots__ = ("parent_document", "content", "number")
+
+    def __init__(self, parent_document, content, number=None):
         self.parent_document = parent_document
         self.content = content
+        # page number taken from the file name (_page_N)
+        self.number: int | None = number
 
     def __repr__(self):
         return f"DocumentPage(source={self.parent_document}, content_length={len(self.content)})"
 
     def summarize(self) -> str:
-        return self.content[:100] + "..." if len(self.content) > 100 else self.content 
+        return self.content[:100] + "..." if len(self.content) > 100 else self.content
+
+
+class PageCache:
+    """
+    LRU bound on how many decoded LazyPage texts stay resident at once.
+    """
+
+    __slots__ = ("max_pages", "_texts")
+
+    def __init__(self, max_pages: int = 256):
+        self.max_pages = max(1, max_pages)
+        self._texts: OrderedDict = OrderedDict()
+
+    def get(self, page: "LazyPage") -> Optional[str]:
+        text = self._texts.get(page)
+        if text is not None:
+            self._texts.move_to_end(page)
+        return text
+
+    def put(self, page: "LazyPage", text: str) -> None:
+        self._texts[page] = text
+        self._texts.move_to_end(page)
+        while len(self._texts) > self.max_pages:
+            self._texts.popitem(last=False)
+
+    def clear(self) -> None:
+        self._texts.clear()
+
+    def __len__(self):
+        return len(self._texts)
 
+
+DEFAULT_PAGE_CACHE = PageCache()
+
+
+class LazyPage(Page):
+    """
+    Page backed by its source file: only the path and byte range are stored,
+    and the text is read (optionally through mmap) the first time it is needed.
+    Decoded texts are kept in a shared PageCache, so only the most recently
+    used pages stay in memory.
+    """
+
+    __slots__ = ("path", "offset", "length", "use_mmap", "cache")
+
+    def __init__(
+        self,
+        parent_document,
+        path: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        use_mmap: bool = False,
+        cache: Optional[PageCache] = None,
+        number: Optional[int] = None,
+    ):
+        self.parent_document = parent_document
+        self.number = number
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.use_mmap = use_mmap
+        self.cache = cache if cache is not None else DEFAULT_PAGE_CACHE
+
+    @property
+    def content(self) -> str:
+        text = self.cache.get(self)
+        if text is None:
+            text = self._read()
+            self.cache.put(self, text)
+        return text
+
+    def _read(self) -> str:
+        with open(self.path, "rb") as file:
+            if self.use_mmap and self.length != 0:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    end = len(mapped) if self.length is None else self.offset + self.length
+                    data = mapped[self.offset:end]
+            else:
+                file.seek(self.offset)
+                data = file.read(-1 if self.length is None else self.length)
+
+        text = data.decode("utf-8")
+        # match the universal-newline translation of open(..., "r")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
+
+    def __repr__(self):
+        return f"DocumentPage(source={self.parent_document}, path={self.path}, offset={self.offset}, length={self.length})"
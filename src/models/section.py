@@ -1,21 +1,82 @@
-import uuid
-
+from models.identifiers import next_id, stable_id
 from models.page import Page
 
 
 class Section:
-    def __init__(self, source_chapter, source_document, name=""):
-        self.id = str(uuid.uuid4())
+    __slots__ = (
+        "id",
+        "name",
+        "position",
+        "source_chapter",
+        "source_document",
+        "paragraphs",
+        "kinds",
+        "_content",
+        "_length",
+        "pages",
+        "page_starts",
+        "subsections",
+    )
+
+    def __init__(self, source_chapter, source_document, name="", position=None):
+        self.id: int = next_id()
         self.name = name
+        # index in source_document.sections, used for the stable id
+        self.position: int | None = position
 
         # Parents
         self.source_chapter = source_chapter
         self.source_document = source_document
 
-        self.content = ""
+        # Paragraphs are appended as they are found and joined into `content`
+        # only when it is read, so building a long section stays linear
+        self.paragraphs: list[str] = []
+        # kind of each paragraph ("definition", "theorem", ...), filled by content_classification
+        self.kinds: list[str] = []
+        self._content: str | None = ""
+        self._length = 0
 
         # Relational data
         self.pages: list[Page] = []
+        # (offset in content, page) where the text of each page starts, by offset
+        self.page_starts: list[tuple[int, Page]] = []
+
+        # Children
+        self.subsections: list["Section"] = []
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            self._content = "\n\n".join(self.paragraphs)
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        self.paragraphs = [value] if value else []
+        self.kinds = []
+        self._content = value
+        self._length = len(value)
+        self.page_starts = []
+
+    def add_paragraph(self, text: str, pages=()):
+        """'pages': (offset in text, page) where the text of each page starts."""
+        offset = self._length + 2 if self.paragraphs else 0
+        for start, page in pages:
+            if not self.page_starts or self.page_starts[-1][1] is not page:
+                self.page_starts.append((offset + start, page))
+        self.paragraphs.append(text)
+        self._length = offset + len(text)
+        self._content = None
+
+    def add_page(self, page: Page):
+        # pages are added in reading order, so a page already present is the last one
+        if not self.pages or self.pages[-1] is not page:
+            self.pages.append(page)
+
+    def stable_id(self) -> str:
+        document_name = self.source_document.name if self.source_document is not None else ""
+        chapter_name = self.source_chapter.name if self.source_chapter is not None else ""
+        return stable_id(document_name, chapter_name, self.name, self.position)
 
     def __repr__(self):
         return f"Section(id={self.id}, name={self.name}, source_chapter={self.source_chapter}, source_document={self.source_document}), pages_count={len(self.pages)}, content_length={len(self.content)})"
@@ -0,0 +1,198 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from modules.latex_to_natural import TEMP, build_messages, parse_response
+from modules.llm_dispatcher import LLMDispatcher
+from modules.translation_cache import normalize_latex
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize_answer(english: str) -> str:
+    """Comparison key of a translation: lowercase words, punctuation and spacing ignored."""
+    return _NON_WORD_RE.sub(" ", english.lower()).strip()
+
+
+def _leader(answers: Dict[int, str]) -> Tuple[Optional[str], int]:
+    # (answer key, votes) with the most votes; ties go to the answer that arrived first
+    if not answers:
+        return None, 0
+    return Counter(normalize_answer(english) for english in answers.values()).most_common(1)[0]
+
+
+class ConsensusDispatcher:
+    """
+    Translates each batch of formulas with several models at once and keeps,
+    per formula, the answer a majority of them agree on.
+
+    Every batch is sent to all dispatchers concurrently. As soon as every
+    formula of the batch has 'quorum' matching answers (default: a strict
+    majority of the models) the requests still in flight are cancelled, so a
+    batch costs about the latency of the quorum-th fastest model. Models whose
+    answer differs from the majority are outliers; they, and formulas on
+    which no majority was reached (the most voted answer is kept), are added
+    to 'review' and written to 'review_path' by save_review().
+    """
+
+    def __init__(
+        self,
+        dispatchers: Sequence[LLMDispatcher],
+        quorum: Optional[int] = None,
+        review_path: Optional[str] = None,
+    ):
+        if not dispatchers:
+            raise ValueError("ConsensusDispatcher necesita al menos un modelo")
+        self.dispatchers = list(dispatchers)
+        self.quorum = quorum or len(self.dispatchers) // 2 + 1
+        if not 1 <= self.quorum <= len(self.dispatchers):
+            raise ValueError(f"Quórum inválido: {self.quorum} de {len(self.dispatchers)} modelos")
+        self.review_path = review_path
+        self.review: List[dict] = []
+
+        self.batches = 0
+        self.early_stops = 0
+        self.cancelled = 0
+        self.outliers = 0
+        self.disputed = 0
+
+    @property
+    def models(self) -> List[str]:
+        return [dispatcher.model for dispatcher in self.dispatchers]
+
+    async def _vote(self, sessions, chunk: List[str]) -> Optional[Dict[str, str]]:
+        wanted = {normalize_latex(latex): latex for latex in chunk}
+        votes: Dict[str, Dict[int, str]] = {key: {} for key in wanted}
+        messages = build_messages(chunk)
+        tasks = {
+            asyncio.ensure_future(dispatcher.chat(client, semaphore, messages)): i
+            for i, (dispatcher, (client, semaphore)) in enumerate(zip(self.dispatchers, sessions))
+        }
+        self.batches += 1
+
+        answered = 0
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model = tasks[task]
+                if task.exception() is not None:
+                    print(f"[Consensus] {self.dispatchers[model].model} falló: {task.exception()!r}")
+                    continue
+                answered += 1
+                for latex, english in parse_response(task.result()).items():
+                    key = normalize_latex(latex)
+                    if key in votes:
+                        votes[key][model] = english
+            if pending and all(_leader(answers)[1] >= self.quorum for answers in votes.values()):
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.early_stops += 1
+                self.cancelled += len(pending)
+                break
+
+        if not answered:
+            return None
+        return self._decide(wanted, votes)
+
+    def _decide(self, wanted: Dict[str, str], votes: Dict[str, Dict[int, str]]) -> Dict[str, str]:
+        chosen: Dict[str, str] = {}
+        for key, answers in votes.items():
+            winner, count = _leader(answers)
+            if winner is None:
+                continue  # no model translated it; latex_to_natural resends it
+            agreed = [i for i, english in answers.items() if normalize_answer(english) == winner]
+            chosen[wanted[key]] = answers[agreed[0]]
+            outliers = {
+                self.dispatchers[i].model: english for i, english in answers.items() if i not in agreed
+            }
+            consensus = count >= self.quorum
+            if consensus and not outliers:
+                continue
+            self.outliers += len(outliers)
+            self.disputed += not consensus
+            self.review.append({
+                "latex": wanted[key],
+                "chosen": chosen[wanted[key]],
+                "consensus": consensus,
+                "agreed": [self.dispatchers[i].model for i in agreed],
+                "outliers": outliers,
+            })
+        return chosen
+
+    async def run(self, chunks: Sequence[List[str]]) -> List[Optional[Dict[str, str]]]:
+        """
+        {latex: english} agreed for each chunk, in chunk order; None when no
+        model answered the chunk at all.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            sessions = [await stack.enter_async_context(dispatcher.session()) for dispatcher in self.dispatchers]
+            return list(await asyncio.gather(*(self._vote(sessions, chunk) for chunk in chunks)))
+
+    def run_sync(self, chunks: Sequence[List[str]]) -> List[Optional[Dict[str, str]]]:
+        """Blocking wrapper around run() for the synchronous pipeline stages."""
+        return asyncio.run(self.run(chunks))
+
+    def save_review(self, path: Optional[str] = None) -> Optional[str]:
+        """Write the review records as JSON Lines to 'path' (default review_path)."""
+        path = path or self.review_path
+        if path is None:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self.review:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        print(f"[Consensus] {len(self.review)} fórmulas para revisar guardadas en {path}")
+        return path
+
+    def stats(self) -> dict:
+        return {
+            "models": len(self.dispatchers),
+            "quorum": self.quorum,
+            "batches": self.batches,
+            "early_stops": self.early_stops,
+            "cancelled": self.cancelled,
+            "outliers": self.outliers,
+            "disputed": self.disputed,
+        }
+
+
+def make_consensus(
+    models: Sequence[str],
+    host,
+    quorum: Optional[int] = None,
+    review_path: Optional[str] = None,
+    concurrency: int = 4,
+    timeout: float = 120.0,
+    max_retries: int = 3,
+) -> ConsensusDispatcher:
+    """
+    ConsensusDispatcher over one LLMDispatcher per model, configured like
+    make_dispatcher. 'host' is one Ollama host for every model or a list
+    with one host per model.
+    """
+    hosts = [host] * len(models) if host is None or isinstance(host, str) else list(host)
+    if len(hosts) != len(models):
+        raise ValueError(f"{len(models)} modelos pero {len(hosts)} hosts")
+    return ConsensusDispatcher(
+        [
+            LLMDispatcher(
+                model=model,
+                host=model_host,
+                concurrency=concurrency,
+                timeout=timeout,
+                max_retries=max_retries,
+                options={"temperature": TEMP},
+            )
+            for model, model_host in zip(models, hosts)
+        ],
+        quorum=quorum,
+        review_path=review_path,
+    )
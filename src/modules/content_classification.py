@@ -1,16 +1,172 @@
-from models.content import Content
+import json
+import re
+from collections import Counter
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
+from models.document import Document
 from utils import verbose_print
 
-def split_contents(contents: list[Content]) -> list[Content]:
+PARAGRAPH = "paragraph"
+KINDS = (
+    PARAGRAPH, "definition", "theorem", "lemma", "proposition", "corollary",
+    "example", "proof", "remark", "exercise",
+)
+
+# A block that opens with a capitalized label, an optional number and name,
+# and a period or colon: "Definition 2.1.", "**Teorema 3 (Bolzano).**", "Proof:"
+HEADER_RE = re.compile(
+    r"^[\W_]{0,4}"
+    r"(?:(?P<definition>Definitions?|Definici[oó]n(?:es)?)"
+    r"|(?P<theorem>Theorems?|Teoremas?)"
+    r"|(?P<lemma>Lemmas?|Lemas?)"
+    r"|(?P<proposition>Propositions?|Proposici[oó]n(?:es)?)"
+    r"|(?P<corollary>Corollary|Corollaries|Corolarios?)"
+    r"|(?P<example>Examples?|Ejemplos?)"
+    r"|(?P<proof>Proof|Demostraci[oó]n|Prueba)"
+    r"|(?P<remark>Remarks?|Observaci[oó]n(?:es)?|Nota)"
+    r"|(?P<exercise>Exercises?|Ejercicios?))"
+    r"(?:\s+[\dIVXivx]+(?:\.\d+)*)?"
+    r"(?:\s*\([^)\n]{0,80}\))?"
+    r"[*_\s]*[.:]"
+)
+# Lowercase phrases that suggest a kind anywhere in the block; not conclusive
+# on their own. Searched with str.find, which is several times faster than one
+# regex alternation scanned over every paragraph.
+CUE_PHRASES = (
+    ("we define", "definition"), ("we call", "definition"), ("we say that", "definition"),
+    ("is called", "definition"), ("is said to be", "definition"), ("se define", "definition"),
+    ("se llama", "definition"), ("se dice que", "definition"), ("decimos que", "definition"),
+    ("for example", "example"), ("for instance", "example"), ("por ejemplo", "example"),
+    ("consider the following", "example"),
+    ("we prove", "proof"), ("we now prove", "proof"), ("it follows that", "proof"),
+    ("demostramos", "proof"), ("q.e.d", "proof"), ("∎", "proof"), ("□", "proof"), ("■", "proof"),
+    ("the following theorem", "theorem"), ("the following result", "theorem"),
+    ("se cumple el siguiente", "theorem"),
+)
+
+# texts -> one kind (or None when undecided) per text
+BatchClassifier = Callable[[List[str]], List[Optional[str]]]
+
+
+def _find_cue(lowered: str) -> Optional[str]:
+    for phrase, kind in CUE_PHRASES:
+        i = lowered.find(phrase)
+        while i != -1:
+            end = i + len(phrase)
+            # whole words only: "is called" must not match inside "this called"
+            if (i == 0 or not lowered[i - 1].isalnum()) and (end == len(lowered) or not lowered[end].isalnum()):
+                return kind
+            i = lowered.find(phrase, i + 1)
+    return None
+
+
+def classify_paragraph(text: str) -> Tuple[str, bool]:
     """
-    Etapa 2.2: Clasificar el contenido de los documentos en párrafos, ejemplos, definiciones y teoremas.
+    (kind, ambiguous) of one paragraph. A labelled header decides the kind;
+    a cue phrase alone gives a guess marked as ambiguous; anything else is
+    a plain paragraph.
+    """
+    match = HEADER_RE.match(text)
+    if match is not None:
+        return match.lastgroup, False
+    kind = _find_cue(text.lower())
+    if kind is not None:
+        return kind, True
+    return PARAGRAPH, False
 
-    Args: 
-        documents list[Document]: Lista de objetos Document cargados previamente.
-    Returns:
-        Tuple[list[Chapter], list[Section], list[Content]]: Listas de capítulos, secciones y contenidos extraídos.
-     """
 
-    return contents
+def classify_document(document: Document, fallback: Optional[BatchClassifier] = None) -> Counter:
+    """
+    Fill section.kinds for every section of the document in one pass over
+    its paragraphs. With a 'fallback', the ambiguous paragraphs of the whole
+    document are sent to it in one batch; kinds it does not decide keep
+    the rule-based guess. Returns the count of each kind.
+    """
+    ambiguous: List[Tuple[list, int, str]] = []
+    counts: Counter = Counter()
+    for section in document.sections:
+        kinds = []
+        for paragraph in section.paragraphs:
+            kind, unsure = classify_paragraph(paragraph)
+            if unsure and fallback is not None:
+                ambiguous.append((kinds, len(kinds), paragraph))
+            kinds.append(kind)
+        section.kinds = kinds
+
+    if ambiguous:
+        decided = fallback([paragraph for _, _, paragraph in ambiguous])
+        for (kinds, i, _), kind in zip(ambiguous, decided):
+            if kind in KINDS:
+                kinds[i] = kind
+
+    for section in document.sections:
+        counts.update(section.kinds)
+    verbose_print(
+        "[Content Classification] %s: %s (%d ambiguos)", document.name, dict(counts), len(ambiguous)
+    )
+    return counts
+
 
+def make_llm_classifier(dispatcher, batch_size: int = 20) -> BatchClassifier:
+    """
+    BatchClassifier that asks the LLM, through an LLMDispatcher, for the
+    kind of each paragraph: batch_size paragraphs per request, all requests
+    sent concurrently. Answers that cannot be parsed leave their paragraphs
+    undecided.
+    """
+    def build_messages(batch: List[str]):
+        numbered = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(batch))
+        return [
+            {"role": "system", "content": "You classify paragraphs of mathematics textbooks."},
+            {"role": "user", "content": (
+                f"Classify each numbered paragraph as one of: {', '.join(KINDS)}. "
+                "Return only a JSON array with one label per paragraph, in order.\n\n"
+                f"{numbered}"
+            )},
+        ]
+
+    def classify(texts: List[str]) -> List[Optional[str]]:
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        responses = dispatcher.run_sync([build_messages(batch) for batch in batches])
+        kinds: List[Optional[str]] = []
+        for batch, response in zip(batches, responses):
+            labels = None
+            if response is not None:
+                try:
+                    labels = json.loads(re.sub(r"^```(?:json)?\s*|\s*```$", "", response.strip()))
+                except json.JSONDecodeError:
+                    labels = None
+            if not isinstance(labels, list) or len(labels) != len(batch):
+                kinds.extend([None] * len(batch))
+            else:
+                kinds.extend(str(label).strip().lower() for label in labels)
+        return kinds
+
+    return classify
+
+
+def iter_classify_contents(
+    documents: Iterable[Document], fallback: Optional[BatchClassifier] = None
+) -> Iterator[Document]:
+    """Streaming variant of classify_contents: classify and yield each document."""
+    for document in documents:
+        classify_document(document, fallback)
+        yield document
+
+
+def classify_contents(documents: List[Document], fallback: Optional[BatchClassifier] = None) -> Counter:
+    """
+    Etapa 2.2: Clasificar el contenido de los documentos en párrafos, ejemplos, definiciones y teoremas.
+
+    Args:
+        documents list[Document]: documentos ya separados por split_contents.
+        fallback: clasificador por lotes (p. ej. make_llm_classifier) para los párrafos ambiguos.
+    Returns:
+        Counter: cantidad de párrafos de cada tipo. Cada sección queda con section.kinds,
+        paralelo a section.paragraphs.
+    """
+    counts: Counter = Counter()
+    for document in documents:
+        counts.update(classify_document(document, fallback))
+    print(f"[Content Classification] {sum(counts.values())} párrafos clasificados: {dict(counts)}")
+    return counts
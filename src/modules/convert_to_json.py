@@ -0,0 +1,168 @@
+import gzip
+import json
+import os
+from typing import Iterable, Iterator, List, Optional
+
+from models.document import Document
+from modules.save_contents import document_dirname
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for compression="zstd"
+    zstandard = None
+
+EXTENSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+class JsonlWriter:
+    """
+    Appends JSON records, one per line, to a (optionally gzip/zstd
+    compressed) file. Encoded lines are buffered and written in blocks of
+    about buffer_size bytes; the file is written under a temporary name and
+    only replaces 'path' on close().
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None, buffer_size: int = 1 << 20):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Compresión no soportada: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Compresión zstd requiere el paquete 'zstandard'")
+        self.path = path
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+
+        self._tmp_path = f"{path}.tmp-{os.getpid()}"
+        self._raw = open(self._tmp_path, "wb")
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        elif compression == "zstd":
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(self._raw)
+        else:
+            self._stream = self._raw
+
+    def write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        self.records += 1
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._stream.write(b"".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def close(self) -> None:
+        self._flush()
+        if self._stream is not self._raw:
+            self._stream.close()
+        if not self._raw.closed:
+            self._raw.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._raw.close()
+            os.remove(self._tmp_path)
+
+
+def section_records(document: Document) -> Iterator[dict]:
+    """
+    One record per section of the split tree, in reading order:
+        {"id", "book", "chapter", "chapter_index", "section", "section_index",
+         "path": [top-level section, ..., section], "pages": [page indices], "content",
+         "kinds": [kind of each paragraph, if classified]}
+    Text found before any chapter comes first as a record with "section": null.
+    """
+    page_index = {id(page): i for i, page in enumerate(document.pages)}
+    chapter_index = {id(chapter): i for i, chapter in enumerate(document.chapters)}
+    parents = {
+        id(subsection): section
+        for section in document.sections
+        for subsection in section.subsections
+    }
+
+    if document.orphan_contents:
+        yield {
+            "id": document.stable_id(),
+            "book": document.name,
+            "chapter": None,
+            "chapter_index": None,
+            "section": None,
+            "section_index": None,
+            "path": [],
+            "pages": [],
+            "content": "\n\n".join(document.orphan_contents),
+            "kinds": [],
+        }
+
+    for section_idx, section in enumerate(document.sections):
+        path = [section.name]
+        parent = parents.get(id(section))
+        while parent is not None:
+            path.append(parent.name)
+            parent = parents.get(id(parent))
+        chapter = section.source_chapter
+        yield {
+            "id": section.stable_id(),
+            "book": document.name,
+            "chapter": chapter.name if chapter is not None else None,
+            "chapter_index": chapter_index.get(id(chapter)),
+            "section": section.name,
+            "section_index": section_idx,
+            "path": path[::-1],
+            "pages": [page_index[id(page)] for page in section.pages if id(page) in page_index],
+            "content": section.content,
+            "kinds": section.kinds,
+        }
+
+
+def _json_root(artifacts_path: str) -> str:
+    root = os.path.join(artifacts_path, "json")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def convert_document(document: Document, root: str, compression: Optional[str] = "gzip") -> str:
+    """Write root/<document_name>.jsonl[.gz|.zst] and return its path."""
+    path = os.path.join(root, document_dirname(document.name) + EXTENSIONS[compression])
+    with JsonlWriter(path, compression) as writer:
+        for record in section_records(document):
+            writer.write(record)
+    print(f"[Convert to JSON] {writer.records} registros guardados en {path}")
+    return path
+
+
+def iter_convert_to_json(
+    documents: Iterable[Document], artifacts_path: str, compression: Optional[str] = "gzip"
+) -> Iterator[Document]:
+    """
+    Streaming variant of convert_to_json: export each document as soon as it
+    is received and yield it.
+    """
+    root = _json_root(artifacts_path)
+    for document in documents:
+        convert_document(document, root, compression)
+        yield document
+
+
+def convert_to_json(
+    documents: List[Document], artifacts_path: str, compression: Optional[str] = "gzip"
+) -> None:
+    """
+    Export the split documents as JSON Lines, one file per book and one
+    record per section (see section_records):
+      artifacts_path/json/<document_name>.jsonl.gz
+    compression is "gzip", "zstd" (needs the zstandard package) or None.
+    """
+    for _ in iter_convert_to_json(documents, artifacts_path, compression):
+        pass
@@ -0,0 +1,171 @@
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from models.document import Document
+from modules.save_contents import document_dirname
+
+MAGIC = b"EVIACORP"
+FORMAT_VERSION = 1
+EXTENSION = ".corpus"
+# magic, version, entries, metadata length
+_PREFIX = struct.Struct("<8sIIQ")
+# byte offset in the blob and byte length of one entry
+_ENTRY = struct.Struct("<QQ")
+
+
+class CorpusWriter:
+    """
+    Writes a split book into one file:
+
+        prefix   magic, format version, entry count, metadata length
+        table    (offset, length) of every entry, fixed width
+        metadata JSON: book name, chapters, and per section its id, name,
+                 chapter, parent section and page indices
+        blob     UTF-8 text of every entry, back to back
+
+    Entry 0 is the text found before any chapter (orphan contents); entry
+    i + 1 is document.sections[i]. Texts are streamed into the blob one at a
+    time and the table is filled in at the end, so memory does not grow
+    with the book. The file replaces 'path' only once complete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def _metadata(document: Document) -> dict:
+        page_index = {id(page): i for i, page in enumerate(document.pages)}
+        chapter_index = {id(chapter): i for i, chapter in enumerate(document.chapters)}
+        section_index = {id(section): i for i, section in enumerate(document.sections)}
+        parents = {
+            id(subsection): section_index[id(section)]
+            for section in document.sections
+            for subsection in section.subsections
+        }
+        return {
+            "book": document.name,
+            "chapters": [chapter.name for chapter in document.chapters],
+            "sections": [
+                {
+                    "id": section.stable_id(),
+                    "name": section.name,
+                    "chapter": chapter_index.get(id(section.source_chapter)),
+                    "parent": parents.get(id(section)),
+                    "pages": [page_index[id(page)] for page in section.pages if id(page) in page_index],
+                }
+                for section in document.sections
+            ],
+        }
+
+    def write(self, document: Document) -> str:
+        metadata = json.dumps(self._metadata(document), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        texts = ["\n\n".join(document.orphan_contents)]
+        entries = len(document.sections) + 1
+
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        table = bytearray(entries * _ENTRY.size)
+        with open(tmp_path, "wb", buffering=1 << 20) as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, entries, len(metadata)))
+            f.write(table)
+            f.write(metadata)
+            offset = 0
+            sections = iter(document.sections)
+            for i in range(entries):
+                data = (texts[0] if i == 0 else next(sections).content).encode("utf-8")
+                f.write(data)
+                _ENTRY.pack_into(table, i * _ENTRY.size, offset, len(data))
+                offset += len(data)
+            f.seek(_PREFIX.size)
+            f.write(table)
+        os.replace(tmp_path, self.path)
+        return self.path
+
+
+class CorpusReader:
+    """
+    Read access to a book written by CorpusWriter. The file is memory
+    mapped: opening it only parses the prefix and the metadata, and any
+    section is decoded from its own byte range, by index or by stable id.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.entries, metadata_length = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} no es un corpus versión {FORMAT_VERSION}")
+        metadata_start = _PREFIX.size + self.entries * _ENTRY.size
+        self._blob_start = metadata_start + metadata_length
+        self.metadata = json.loads(self._mmap[metadata_start:self._blob_start].decode("utf-8"))
+        self.sections: List[dict] = self.metadata["sections"]
+        self._ids: Dict[str, int] = {section["id"]: i for i, section in enumerate(self.sections)}
+
+    def __len__(self):
+        return len(self.sections)
+
+    def _entry(self, i: int) -> str:
+        offset, length = _ENTRY.unpack_from(self._mmap, _PREFIX.size + i * _ENTRY.size)
+        start = self._blob_start + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def orphan_contents(self) -> str:
+        return self._entry(0)
+
+    def section(self, index: int) -> str:
+        """Content of document.sections[index]."""
+        if not 0 <= index < len(self.sections):
+            raise IndexError(index)
+        return self._entry(index + 1)
+
+    def section_by_id(self, section_id: str) -> Optional[str]:
+        index = self._ids.get(section_id)
+        return self.section(index) if index is not None else None
+
+    def iter_sections(self) -> Iterator[tuple]:
+        """(metadata, content) of every section in order."""
+        for i, section in enumerate(self.sections):
+            yield section, self.section(i)
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def corpus_root(artifacts_path: str) -> str:
+    return os.path.join(artifacts_path, "corpus")
+
+
+def corpus_path(root: str, name: Optional[str]) -> str:
+    return os.path.join(root, document_dirname(name) + EXTENSION)
+
+
+def iter_save_corpus(documents: Iterable[Document], artifacts_path: str) -> Iterator[Document]:
+    """Streaming variant of save_corpus: write each book as it is received and yield it."""
+    root = corpus_root(artifacts_path)
+    os.makedirs(root, exist_ok=True)
+    for document in documents:
+        path = CorpusWriter(corpus_path(root, document.name)).write(document)
+        print(f"[Corpus Store] Guardado documento completo en {path}")
+        yield document
+
+
+def save_corpus(documents: List[Document], artifacts_path: str) -> None:
+    """
+    Save every document as one file, artifacts_path/corpus/<document_name>.corpus
+    (see CorpusWriter); the alternative to the per-section text files of
+    save_contents, selected with config["artifact_backend"] = "corpus".
+    """
+    for _ in iter_save_corpus(documents, artifacts_path):
+        pass
+    print("[Corpus Store] Guardado de todos los documentos completado.")
@@ -0,0 +1,332 @@
+import json
+import os
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.document import Document
+from modules.latex_verification import MATH_RE
+from utils import verbose_print
+
+STATE_VERSION = "2"
+_WORD_RE = re.compile(r"\w+")
+_EMPTY = 1 << 32
+
+# (document name, page or section index)
+Key = Tuple[str, int]
+
+
+class MinHasher:
+    """
+    MinHash signatures of texts over their word 'shingle_size'-grams.
+
+    Uses one-permutation hashing: each shingle is hashed once (crc32) and
+    the hash picks one of 'num_hashes' bins, which keeps its minimum, so a
+    signature costs one hash per shingle instead of one per shingle and
+    permutation. Empty bins borrow the next filled bin (rotation
+    densification). The fraction of equal bins of two signatures estimates
+    the Jaccard similarity of their shingle sets. Texts with fewer than
+    'min_shingles' shingles get no signature: too short to compare.
+    """
+
+    def __init__(self, num_hashes: int = 64, shingle_size: int = 4, min_shingles: int = 8):
+        self.num_hashes = num_hashes
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        words = _WORD_RE.findall(text.lower())
+        size = self.shingle_size
+        count = len(words) - size + 1
+        if count < self.min_shingles:
+            return None
+
+        bins = self.num_hashes
+        mins = [_EMPTY] * bins
+        for i in range(count):
+            h = zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+            b = h % bins
+            value = h // bins
+            if value < mins[b]:
+                mins[b] = value
+
+        if _EMPTY in mins:
+            filled = [b for b in range(bins) if mins[b] != _EMPTY]
+            dense = list(mins)
+            for b in range(bins):
+                if mins[b] == _EMPTY:
+                    # nearest filled bin to the right, offset by the distance
+                    source = next((f for f in filled if f > b), filled[0])
+                    dense[b] = mins[source] + ((source - b) % bins) * _EMPTY
+            mins = dense
+        return tuple(mins)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures of the same MinHasher."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures: each signature is cut
+    into 'bands' bands of 'rows' values, and two signatures are candidates
+    when any band is equal. A lookup only touches the matching buckets, so
+    it does not grow with the number of indexed signatures.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[Tuple[int, ...], List[Key]]] = [defaultdict(list) for _ in range(bands)]
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def add(self, key: Key, signature: Tuple[int, ...]) -> None:
+        for band, values in self._band_keys(signature):
+            self._buckets[band][values].append(key)
+
+    def candidates(self, signature: Tuple[int, ...]) -> set:
+        found = set()
+        for band, values in self._band_keys(signature):
+            found.update(self._buckets[band].get(values, ()))
+        return found
+
+
+class DuplicateFinder:
+    """
+    Incremental near-duplicate detection: add() each text in order; a text
+    whose estimated similarity to an earlier canonical text of another group
+    (document) reaches 'threshold' is a duplicate of it, otherwise it
+    becomes a canonical text itself.
+    """
+
+    def __init__(self, threshold: float = 0.7, num_hashes: int = 64, bands: int = 16, shingle_size: int = 4):
+        if num_hashes % bands:
+            raise ValueError(f"num_hashes ({num_hashes}) debe ser múltiplo de bands ({bands})")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_hashes, shingle_size)
+        self.lsh = LSHIndex(bands, num_hashes // bands)
+        self.signatures: Dict[Key, Tuple[int, ...]] = {}
+        self.compared = 0
+
+    def add(self, key: Key, text: str) -> Optional[Key]:
+        """Canonical key 'key' duplicates, or None (new canonical, or too short to compare)."""
+        return self.add_signature(key, self.hasher.signature(text))
+
+    def add_signature(self, key: Key, signature: Optional[Tuple[int, ...]]) -> Optional[Key]:
+        """add() for a signature already computed by this finder's hasher."""
+        if signature is None:
+            return None
+        best, best_score = None, 0.0
+        for candidate in self.lsh.candidates(signature):
+            if candidate[0] == key[0]:
+                continue  # only across documents
+            self.compared += 1
+            score = similarity(signature, self.signatures[candidate])
+            if score < self.threshold:
+                continue
+            # ties go to the smallest key, so the result does not depend on set order
+            if score > best_score or (score == best_score and candidate < best):
+                best, best_score = candidate, score
+        if best is not None:
+            return best
+        self.signatures[key] = signature
+        self.lsh.add(key, signature)
+        return None
+
+
+class Duplicates:
+    """
+    Near-duplicate pages and sections of the corpus, each mapped to the
+    canonical copy it was first seen as: {(document, index): (document, index)},
+    with page indices into document.pages and section indices into
+    document.sections.
+
+    The length and signature of every page and section (and the number of
+    formulas of every section) are kept per document, in the order the documents were added, so the state can be
+    saved and loaded by the next incremental run (save_state, load_state):
+    books that are skipped keep their fingerprints. Adding a document that
+    is already known replaces its fingerprints in place; since it may have
+    been the canonical copy of other pages, the mappings are then rebuilt
+    from the stored signatures before the next report.
+    """
+
+    def __init__(self, threshold: float = 0.7):
+        self.threshold = threshold
+        # name -> {"pages": [[length, signature or None], ...], "sections": [[length, signature, formulas], ...]}
+        self.documents: Dict[str, dict] = {}
+        self._reset()
+
+    def _reset(self) -> None:
+        self.page_finder = DuplicateFinder(self.threshold)
+        self.section_finder = DuplicateFinder(self.threshold)
+        self.pages: Dict[Key, Key] = {}
+        self.sections: Dict[Key, Key] = {}
+        self.totals = {"pages": 0, "sections": 0, "page_chars": 0, "section_chars": 0}
+        self.saved = {"page_chars": 0, "section_chars": 0, "formulas": 0}
+        self._stale = False
+
+    def _index(self, name: str, record: dict) -> None:
+        for kind, finder, mapping in (
+            ("page", self.page_finder, self.pages),
+            ("section", self.section_finder, self.sections),
+        ):
+            for i, (length, signature, *formulas) in enumerate(record[kind + "s"]):
+                self.totals[kind + "s"] += 1
+                self.totals[kind + "_chars"] += length
+                canonical = finder.add_signature((name, i), signature)
+                if canonical is not None:
+                    mapping[(name, i)] = canonical
+                    self.saved[kind + "_chars"] += length
+                    self.saved["formulas"] += sum(formulas)
+
+    def _rebuild(self) -> None:
+        if self._stale:
+            self._reset()
+            for name, record in self.documents.items():
+                self._index(name, record)
+
+    def add_document(self, document: Document) -> None:
+        """Fingerprint the pages and sections of one split document."""
+        page_hasher, section_hasher = self.page_finder.hasher, self.section_finder.hasher
+        record = {
+            "pages": [[len(page.content), page_hasher.signature(page.content)] for page in document.pages],
+            "sections": [
+                [len(section.content), section_hasher.signature(section.content), len(MATH_RE.findall(section.content))]
+                for section in document.sections
+            ],
+        }
+        replaced = document.name in self.documents
+        self.documents[document.name] = record
+        if replaced or self._stale:
+            self._stale = True
+            verbose_print("[Dedup] %s reprocesado: los duplicados se recalculan al final", document.name)
+            return
+        pages, sections = len(self.pages), len(self.sections)
+        self._index(document.name, record)
+        verbose_print(
+            "[Dedup] %s: %d páginas y %d secciones duplicadas",
+            document.name,
+            len(self.pages) - pages,
+            len(self.sections) - sections,
+        )
+
+    def canonical_page(self, document: str, page_idx: int) -> Optional[Key]:
+        """(document, page index) of the canonical copy of a duplicate page, or None."""
+        self._rebuild()
+        return self.pages.get((document, page_idx))
+
+    def canonical_section(self, document: str, section_idx: int) -> Optional[Key]:
+        """(document, section index) of the canonical copy of a duplicate section, or None."""
+        self._rebuild()
+        return self.sections.get((document, section_idx))
+
+    def report(self, chunk_size: int = 500) -> dict:
+        """
+        Totals, the characters the duplicate copies account for, and an
+        estimate of the LLM work they save: the formulas of duplicate
+        sections, which later stages can take from the canonical copy, and
+        the translation requests of chunk_size formulas they would fill.
+        """
+        self._rebuild()
+        return {
+            "pages": {"total": self.totals["pages"], "duplicates": len(self.pages)},
+            "sections": {"total": self.totals["sections"], "duplicates": len(self.sections)},
+            "chars_saved": {
+                "pages": self.saved["page_chars"],
+                "pages_ratio": round(self.saved["page_chars"] / self.totals["page_chars"], 4) if self.totals["page_chars"] else 0.0,
+                "sections": self.saved["section_chars"],
+                "sections_ratio": round(self.saved["section_chars"] / self.totals["section_chars"], 4) if self.totals["section_chars"] else 0.0,
+            },
+            "llm_saved": {
+                "formulas": self.saved["formulas"],
+                "calls": -(-self.saved["formulas"] // chunk_size),
+            },
+            "comparisons": self.page_finder.compared + self.section_finder.compared,
+        }
+
+    def save(self, path: str) -> None:
+        """Write the report and both mappings as JSON (atomic replace)."""
+        def pairs(mapping: Dict[Key, Key]) -> List[list]:
+            return [[name, idx, canonical[0], canonical[1]] for (name, idx), canonical in mapping.items()]
+
+        data = {
+            "threshold": self.threshold,
+            "report": self.report(),
+            "pages": pairs(self.pages),
+            "sections": pairs(self.sections),
+        }
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def save_state(self, path: str) -> None:
+        """Write the per-document lengths and signatures as JSON (atomic replace)."""
+        data = {"version": STATE_VERSION, "documents": self.documents}
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_state(cls, path: str, threshold: float = 0.7) -> "Duplicates":
+        """The state saved at path, or an empty one if missing or from another version."""
+        duplicates = cls(threshold)
+        if not os.path.exists(path):
+            return duplicates
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != STATE_VERSION:
+            print(f"[Dedup] Versión distinta ({data.get('version')} -> {STATE_VERSION}), se descartan las firmas")
+            return duplicates
+        for record in data["documents"].values():
+            for kind in ("pages", "sections"):
+                record[kind] = [
+                    [length, tuple(signature) if signature else None, *rest] for length, signature, *rest in record[kind]
+                ]
+        duplicates.documents = data["documents"]
+        # the mappings depend on the threshold, so they are always rebuilt from the signatures
+        duplicates._stale = bool(duplicates.documents)
+        return duplicates
+
+
+def iter_find_duplicates(documents: Iterable[Document], duplicates: Duplicates) -> Iterator[Document]:
+    """Streaming variant of find_duplicates: fingerprint each document into 'duplicates' and yield it."""
+    for document in documents:
+        duplicates.add_document(document)
+        yield document
+
+
+def find_duplicates(
+    documents: List[Document], threshold: float = 0.7, duplicates: Optional[Duplicates] = None
+) -> Duplicates:
+    """
+    Etapa 2.3: Detectar páginas y secciones casi duplicadas entre documentos
+    (ediciones y reimpresiones del mismo libro) con MinHash y LSH.
+
+    Args:
+        documents list[Document]: documentos ya separados por split_contents, en orden;
+            la primera aparición de un texto es la copia canónica.
+        threshold (float): similitud de Jaccard estimada mínima para considerar duplicado.
+        duplicates (Optional[Duplicates]): estado de una ejecución anterior (Duplicates.load_state)
+            al que se añaden los documentos; por defecto uno vacío con 'threshold'.
+    Returns:
+        Duplicates: páginas y secciones duplicadas con su copia canónica.
+    """
+    if duplicates is None:
+        duplicates = Duplicates(threshold)
+    for _ in iter_find_duplicates(documents, duplicates):
+        pass
+    report = duplicates.report()
+    print(
+        f"[Dedup] Páginas duplicadas: {report['pages']['duplicates']}/{report['pages']['total']}, "
+        f"secciones duplicadas: {report['sections']['duplicates']}/{report['sections']['total']}, "
+        f"fórmulas reutilizables: {report['llm_saved']['formulas']} (~{report['llm_saved']['calls']} llamadas al LLM)"
+    )
+    return duplicates
@@ -0,0 +1,174 @@
+import json
+import os
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from models.document import Document
+from models.formula import Formula
+from modules.translation_cache import normalize_latex
+
+INDEX_VERSION = "2"
+# fields of a posting, stored flat in one array per formula
+_POSTING_FIELDS = 6
+# fields of a document span (section, start, end, formula id), flat in one array per document
+_SPAN_FIELDS = 4
+
+
+class Posting(NamedTuple):
+    document: str
+    chapter: int  # index in document.chapters, -1 outside any chapter
+    section: int  # index in document.sections
+    page: int  # index in document.pages of the page the formula starts on
+    start: int  # offsets in section.content, end exclusive
+    end: int
+
+
+class FormulaIndex:
+    """
+    Every distinct formula of the corpus (by normalized LaTeX) with the list
+    of places it occurs. Formulas get a dense integer id; the postings of
+    each formula are one flat array of ints, so the index stays small even
+    for millions of occurrences, and lookups by LaTeX are a dict access.
+
+    Books are added as they stream through the pipeline; adding a book again
+    replaces its previous postings. Each book also keeps the flat list of
+    its own spans, so per-book queries and removals only touch that book's
+    formulas, not the whole corpus.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        # id -> first LaTeX seen for the formula (what gets translated)
+        self.formulas: List[str] = []
+        self.postings: List[array] = []
+        self.documents: List[str] = []
+        # document id -> flat (section, start, end, formula id) spans
+        self.document_postings: List[array] = []
+        self._document_ids: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def lookup(self, latex: str) -> Optional[int]:
+        return self.ids.get(normalize_latex(latex))
+
+    def add(self, latex: str, document: str, chapter: int, section: int, page: int, start: int, end: int) -> int:
+        key = normalize_latex(latex)
+        formula_id = self.ids.get(key)
+        if formula_id is None:
+            formula_id = self.ids[key] = len(self.formulas)
+            self.formulas.append(latex)
+            self.postings.append(array("q"))
+        document_id = self._document_ids.get(document)
+        if document_id is None:
+            document_id = self._document_ids[document] = len(self.documents)
+            self.documents.append(document)
+            self.document_postings.append(array("q"))
+        self.postings[formula_id].extend((document_id, chapter, section, page, start, end))
+        self.document_postings[document_id].extend((section, start, end, formula_id))
+        return formula_id
+
+    def remove_document(self, document: str) -> None:
+        document_id = self._document_ids.get(document)
+        if document_id is None:
+            return
+        spans = self.document_postings[document_id]
+        for formula_id in set(spans[_SPAN_FIELDS - 1::_SPAN_FIELDS]):
+            flat = self.postings[formula_id]
+            kept = array("q")
+            for i in range(0, len(flat), _POSTING_FIELDS):
+                if flat[i] != document_id:
+                    kept.extend(flat[i:i + _POSTING_FIELDS])
+            self.postings[formula_id] = kept
+        self.document_postings[document_id] = array("q")
+
+    def add_document(self, document: Document, formulas_by_section: Iterable[Tuple[int, List[Formula]]]) -> None:
+        """
+        Index the formulas found in each section's content, given as
+        (section index in document.sections, formulas). Offsets are relative
+        to section.content; the page is the one whose text the formula starts
+        in, found by bisecting section.page_starts (the first of the
+        section's pages when it has none).
+        """
+        self.remove_document(document.name)
+        chapter_index = {id(chapter): i for i, chapter in enumerate(document.chapters)}
+        page_index = {id(page): i for i, page in enumerate(document.pages)}
+
+        for section_idx, formulas in formulas_by_section:
+            section = document.sections[section_idx]
+            chapter = chapter_index.get(id(section.source_chapter), -1)
+            offsets = [offset for offset, _ in section.page_starts]
+            first = page_index.get(id(section.pages[0]), -1) if section.pages else -1
+            for formula in formulas:
+                i = bisect_right(offsets, formula.start) - 1
+                page = page_index.get(id(section.page_starts[i][1]), -1) if i >= 0 else first
+                self.add(formula.latex, document.name, chapter, section_idx, page, formula.start, formula.end)
+
+    def occurrences(self, latex_or_id) -> List[Posting]:
+        formula_id = latex_or_id if isinstance(latex_or_id, int) else self.lookup(latex_or_id)
+        if formula_id is None:
+            return []
+        flat = self.postings[formula_id]
+        return [
+            Posting(self.documents[flat[i]], *flat[i + 1:i + _POSTING_FIELDS])
+            for i in range(0, len(flat), _POSTING_FIELDS)
+        ]
+
+    def document_spans(self, document: str) -> Dict[int, List[Tuple[int, int, int]]]:
+        """{section index: [(start, end, formula id), ...] sorted by start} for one book."""
+        document_id = self._document_ids.get(document)
+        spans: Dict[int, List[Tuple[int, int, int]]] = {}
+        if document_id is None:
+            return spans
+        flat = self.document_postings[document_id]
+        for i in range(0, len(flat), _SPAN_FIELDS):
+            spans.setdefault(flat[i], []).append((flat[i + 1], flat[i + 2], flat[i + 3]))
+        for section_spans in spans.values():
+            section_spans.sort()
+        return spans
+
+    def stats(self) -> dict:
+        occurrences = sum(len(flat) for flat in self.postings) // _POSTING_FIELDS
+        return {
+            "formulas": len(self.formulas),
+            "occurrences": occurrences,
+            "documents": len(self.documents),
+            "dedup_ratio": round(occurrences / len(self.formulas), 2) if self.formulas else 0.0,
+        }
+
+    def save(self, path: str) -> None:
+        """Compact JSON; postings are written as flat int lists."""
+        data = {
+            "version": INDEX_VERSION,
+            "documents": self.documents,
+            "formulas": self.formulas,
+            "postings": [flat.tolist() for flat in self.postings],
+            "document_postings": [flat.tolist() for flat in self.document_postings],
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FormulaIndex":
+        """The index saved at path, or an empty one if missing or from another version."""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            print(f"[Formula Index] Versión distinta ({data.get('version')} -> {INDEX_VERSION}), se reconstruye el índice")
+            return index
+        index.documents = data["documents"]
+        index._document_ids = {name: i for i, name in enumerate(index.documents)}
+        index.formulas = data["formulas"]
+        index.ids = {normalize_latex(latex): i for i, latex in enumerate(index.formulas)}
+        index.postings = [array("q", flat) for flat in data["postings"]]
+        index.document_postings = [array("q", flat) for flat in data["document_postings"]]
+        return index
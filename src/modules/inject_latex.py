@@ -0,0 +1,122 @@
+import os
+import shutil
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from models.document import Document
+from models.section import Section
+from modules.formula_index import FormulaIndex
+from modules.save_contents import document_dirname, section_paths
+from modules.translation_cache import normalize_latex
+
+# (start, end, formula id), as returned by FormulaIndex.document_spans
+Span = Tuple[int, int, int]
+
+
+def inject(
+    text: str,
+    spans: Iterable[Span],
+    replacement: Callable[[int], Optional[str]],
+    expected: Optional[Callable[[int], str]] = None,
+) -> str:
+    """
+    Rewrite text in one sweep, replacing each span (sorted by start) with
+    replacement(formula_id). Spans without a replacement, overlapping a
+    previous span or, when 'expected' is given, whose text no longer
+    normalizes to expected(formula_id) are left untouched.
+    """
+    parts = []
+    last = 0
+    for start, end, formula_id in spans:
+        if start < last:
+            continue
+        english = replacement(formula_id)
+        if english is None:
+            continue
+        if expected is not None and normalize_latex(text[start:end]) != normalize_latex(expected(formula_id)):
+            continue  # the text changed since the index was built
+        parts.append(text[last:start])
+        parts.append(english)
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+def iter_inject_document(
+    document: Document,
+    index: FormulaIndex,
+    translations: Dict[str, str],
+    source: Optional[Callable[[Section], Optional[str]]] = None,
+) -> Iterator[Tuple[Section, str]]:
+    """
+    (section, text with its formulas translated) for each section of the
+    document, one at a time. 'translations' maps the index's formulas
+    (index.formulas) to English. The text is section.content unless a
+    'source' returns another one for the section (e.g. its saved artifact).
+    """
+    spans = index.document_spans(document.name)
+
+    def replacement(formula_id: int) -> Optional[str]:
+        return translations.get(index.formulas[formula_id])
+
+    def expected(formula_id: int) -> str:
+        return index.formulas[formula_id]
+
+    for section_idx, section in enumerate(document.sections):
+        text = source(section) if source is not None else section.content
+        if text is None:
+            continue
+        yield section, inject(text, spans.get(section_idx, ()), replacement, expected if source else None)
+
+
+def inject_document(
+    document: Document,
+    index: FormulaIndex,
+    translations: Dict[str, str],
+    artifacts_path: str,
+    from_artifacts: bool = False,
+) -> str:
+    """
+    Write the translated sections of a document to
+    artifacts_path/latex_injection/<document_name>/, mirroring the
+    <chapter>/<section>.txt layout of content_extraction. With
+    from_artifacts the sections are read from the saved
+    content_extraction files instead of section.content (spans whose text
+    changed are skipped). Sections are read, rewritten and written one at a
+    time; the folder replaces the previous one only once it is complete.
+    """
+    doc_dirname = document_dirname(document.name)
+    source_dir = os.path.join(artifacts_path, "content_extraction", doc_dirname)
+    output_root = os.path.join(artifacts_path, "latex_injection")
+    staging_dir = os.path.join(output_root, f".{doc_dirname}.tmp-{os.getpid()}")
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+
+    paths = {id(section): path for section, path in section_paths(document)}
+
+    source = None
+    if from_artifacts:
+        def source(section: Section) -> Optional[str]:
+            path = paths.get(id(section))
+            if path is None or not os.path.exists(os.path.join(source_dir, path)):
+                return None
+            with open(os.path.join(source_dir, path), "r", encoding="utf-8") as f:
+                return f.read()
+
+    written = 0
+    for section, text in iter_inject_document(document, index, translations, source):
+        path = paths.get(id(section))
+        if path is None:
+            continue  # orphan sections are not saved as files
+        target = os.path.join(staging_dir, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(text)
+        written += 1
+
+    doc_dir = os.path.join(output_root, doc_dirname)
+    os.makedirs(staging_dir, exist_ok=True)
+    if os.path.exists(doc_dir):
+        shutil.rmtree(doc_dir)
+    os.rename(staging_dir, doc_dir)
+    print(f"[LaTeX Injection] {written} secciones escritas en {doc_dir}")
+    return doc_dir
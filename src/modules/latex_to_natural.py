@@ -1,10 +1,15 @@
-from ollama import Client
-import time
+import json
+import re
+from typing import Dict, List, Optional
+
+from modules.llm_dispatcher import LLMDispatcher
+from modules.symbol_dictionary import SymbolDictionary
+from modules.token_batcher import TokenBatcher, estimate_tokens
+from modules.translation_cache import TranslationCache, normalize_latex
 
-# Connect to Ollama server
-LLM_NAME = "gemma3:12b"
-client = Client(host='http://10.252.1.2:11435')
 TEMP = 0.1  # Low temperature for deterministic output
+# Bump when format_for_prompt changes, so cached translations are not reused
+PROMPT_VERSION = "1"
 
 def format_for_prompt(chunk):
     """Prepare the content of the user message."""
@@ -23,31 +28,140 @@ def format_for_prompt(chunk):
         f"Now translate the following symbols:\n{symbols_text}"
     )
 
-def process_chunk(chunk):
-    user_message = format_for_prompt(chunk)
-    response = client.chat(
-        model=LLM_NAME,
-        messages=[
-            {"role": "system", "content": "You are a LaTeX translator."},
-            {"role": "user", "content": user_message}
-        ],
-        options={"temperature":0.1}
+def build_messages(chunk):
+    return [
+        {"role": "system", "content": "You are a LaTeX translator."},
+        {"role": "user", "content": format_for_prompt(chunk)}
+    ]
+
+def make_dispatcher(llm_config: dict, client=None) -> LLMDispatcher:
+    """
+    Dispatcher for config["llm"]: model, host, concurrency, timeout (seconds
+    per request) and max_retries. 'client' replaces the ollama.AsyncClient
+    (e.g. a stub in tests).
+    """
+    return LLMDispatcher(
+        model=llm_config["model"],
+        host=llm_config.get("host"),
+        client=client,
+        concurrency=llm_config.get("concurrency", 4),
+        timeout=llm_config.get("timeout", 120.0),
+        max_retries=llm_config.get("max_retries", 3),
+        options={"temperature": TEMP},
+    )
+
+def parse_response(text: str) -> Dict[str, str]:
+    """
+    Parse the model output, a JSON object that may come without its outer
+    braces or wrapped in a ```json fence, into {latex: english}.
+    Returns an empty dict when it cannot be parsed.
+    """
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    if not text.startswith("{"):
+        text = "{" + text.rstrip(",") + "}"
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {str(k): str(v) for k, v in parsed.items()}
+
+def latex_to_natural(
+    latex_list: List[str],
+    chunk_size: int = 500,
+    cache: Optional[TranslationCache] = None,
+    dispatcher: Optional[LLMDispatcher] = None,
+    token_budget: Optional[int] = None,
+    dictionary: Optional[SymbolDictionary] = None,
+    consensus=None,
+) -> Dict[str, str]:
+    """
+    Translate LaTeX expressions to English. Duplicates (after normalization)
+    are sent once; expressions made only of symbols known to 'dictionary'
+    are translated locally, and those found in 'cache' are not sent at all.
+    Batches hold at most chunk_size expressions and, with a token_budget
+    (config["llm"]["maxTokens"]), are packed by estimated token cost so the
+    answer fits in the model's output. A batch whose answer does not parse
+    is split and sent again.
+    The batches are sent concurrently (with retries) by 'dispatcher' (see
+    make_dispatcher), or, with a 'consensus'
+    (modules.consensus.ConsensusDispatcher), translated by several models
+    each and the majority answer is kept; outliers are written to its
+    review file.
+    Returns {latex: english} for every expression that could be translated.
+    """
+    if dispatcher is None and consensus is None:
+        raise ValueError("latex_to_natural necesita un dispatcher o un consensus")
+    # one representative per normalized formula
+    unique: Dict[str, str] = {}
+    for latex in latex_list:
+        unique.setdefault(normalize_latex(latex), latex)
+
+    translated: Dict[str, str] = {}
+    candidates = list(unique.values())
+    if dictionary is not None:
+        resolved, candidates = dictionary.split(candidates)
+        for latex, english in resolved.items():
+            translated[normalize_latex(latex)] = english
+    if cache is not None:
+        cached = cache.get_many(candidates)
+        for latex, english in cached.items():
+            translated[normalize_latex(latex)] = english
+    pending = [latex for key, latex in unique.items() if key not in translated]
+
+    batcher = TokenBatcher(
+        max_tokens=token_budget,
+        max_items=chunk_size,
+        prompt_tokens=estimate_tokens(format_for_prompt([])),
     )
-    print(response.message.content)
-    # Depending on Ollama version, the text might be in response['response'] or response.text
-    text_output = response.get("response") or getattr(response, "text", "")
-    return text_output.strip()
-
-def latex_to_natural(latex_list, chunk_size=500):
-    englishified_list = []
-    for i in range(0, len(latex_list), chunk_size):
-        chunk = latex_list[i:i + chunk_size]
-        print(f"Processing chunk {i // chunk_size + 1} ({len(chunk)} symbols)...")
-        try:
-            englishified = process_chunk(chunk)
-            print(englishified)
-            englishified_list.append(englishified)
-        except Exception as e:
-            print(f"Error processing chunk {i // chunk_size + 1}: {e}")
-            time.sleep(5)  # retry delay
-    return englishified_list
+
+    def store(chunk, englishified) -> List[str]:
+        # the model may reformat the keys; match them back by normalized form
+        wanted = {normalize_latex(latex) for latex in chunk}
+        chunk_translations = {
+            key: english
+            for key, english in ((normalize_latex(k), v) for k, v in englishified.items())
+            if key in wanted
+        }
+        translated.update(chunk_translations)
+        if cache is not None and chunk_translations:
+            cache.put_many(chunk_translations)
+        return [latex for latex in chunk if normalize_latex(latex) not in chunk_translations]
+
+    def send(chunks) -> List[Optional[Dict[str, str]]]:
+        if consensus is not None:
+            print(f"Processing {len(chunks)} chunks with {len(consensus.dispatchers)} models (quorum {consensus.quorum})...")
+            return consensus.run_sync(chunks)
+        print(f"Processing {len(chunks)} chunks, {dispatcher.concurrency} at a time...")
+        responses = dispatcher.run_sync([build_messages(chunk) for chunk in chunks])
+        return [None if response is None else parse_response(response) for response in responses]
+
+    queue = batcher.pack(pending)
+    while queue:
+        retry_queue = []
+        for chunk, englishified in zip(queue, send(queue)):
+            if englishified is None:
+                continue  # transport failure, already retried by the dispatcher
+            missing = store(chunk, englishified)
+            retry_queue.extend(batcher.retry(chunk, missing))
+        queue = retry_queue
+
+    if dictionary is not None:
+        stats = dictionary.stats()
+        print(f"[LaTeX to Natural] Diccionario: {stats['resolved']}/{stats['lookups']} resueltas sin LLM ({stats['offloaded']:.1%})")
+    print(f"[LaTeX to Natural] Lotes: {batcher.metrics()}")
+    if dispatcher is not None:
+        print(f"[LaTeX to Natural] Dispatcher: {dispatcher.stats()}")
+    if consensus is not None:
+        print(f"[LaTeX to Natural] Consenso: {consensus.stats()}")
+        consensus.save_review()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"[LaTeX to Natural] Caché: {stats['hits']} aciertos, {stats['misses']} fallos, {stats['size']} entradas")
+
+    return {
+        latex: translated[key]
+        for latex in latex_list
+        if (key := normalize_latex(latex)) in translated
+    }
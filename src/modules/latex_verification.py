@@ -1,64 +1,326 @@
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from pylatexenc.latexwalker import LatexWalker, LatexMathNode, LatexMacroNode
+import os
+import re
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pylatexenc.latexwalker import (
+    LatexWalker, LatexMathNode, LatexMacroNode, LatexEnvironmentNode, get_default_latex_context_db,
+)
+from pylatexenc.macrospec import MacroStandardArgsParser
 from models.document import Document
+from models.formula import Formula
+from models.page import Page
+
+# $$...$$, \[...\], \(...\) and $...$; an escaped "\$" is a literal dollar
+MATH_RE = re.compile(
+    r"(?<!\\)\$\$(?P<dollars>.+?)(?<!\\)\$\$"
+    r"|(?<!\\)\\\[(?P<bracket>.+?)\\\]"
+    r"|(?<!\\)\\\((?P<paren>.+?)\\\)"
+    r"|(?<!\\)\$(?P<dollar>[^$]+?)(?<!\\)\$",
+    re.DOTALL,
+)
+# (doc_id, page_index, text): all a worker needs to extract one page
+PagePayload = Tuple[int, int, str]
+
+_DELIMITERS = {"dollars": "$$", "bracket": "\\[", "paren": "\\(", "dollar": "$"}
+# control words (\alpha) and control symbols (\, \$ \\), but not the \( \) \[ \] delimiters
+MACRO_RE = re.compile(r"\\(?:[A-Za-z]+|[^A-Za-z()\[\]])")
+# pages the regex cannot handle on its own: environments, or a delimiter left
+# unmatched (e.g. a formula split across pages)
+_NEEDS_WALKER_RE = re.compile(r"\\(?:begin|end)\{|(?<!\\)\$|(?<!\\)\\[\[\]()]")
+# "%" starts a comment: the walker reports nothing inside it
+_COMMENT_RE = re.compile(r"(?<!\\)%")
+_SPACE_RE = re.compile(r"[ \t]*\n?[ \t]*")
+# a "$" nested in a text-mode argument: the regex pairs it with the outer delimiter
+_TEXT_DOLLAR_RE = re.compile(r"\\(?:text|mbox)\{[^}]*\$")
+_BRACE_RE = re.compile(r"(?<!\\)[{}]")
+MATH_ENVIRONMENTS = {
+    "equation", "equation*", "align", "align*", "gather", "gather*",
+    "multline", "multline*", "eqnarray", "eqnarray*", "displaymath", "math",
+}
+
+
+def _line_starts(text: str) -> List[int]:
+    return [0] + [match.end() for match in re.finditer("\n", text)]
+
+
+@lru_cache(maxsize=None)
+def _argspec(name: str) -> Optional[str]:
+    """
+    Arguments pylatexenc parses after a macro ("{{" for \\frac, "[{" for
+    \\sqrt, "" for an unknown macro), or None when its parser is not the
+    standard one (e.g. \\verb).
+    """
+    spec = get_default_latex_context_db().get_macro_spec(name)
+    if spec is None or spec.args_parser is None:
+        return ""
+    if type(spec.args_parser) is not MacroStandardArgsParser:
+        return None
+    return spec.args_parser.argspec
+
+
+def _closing(text: str, pos: int, opening: str, closing: str) -> Optional[int]:
+    """Position after the group opened at pos, skipping nested {...}; None if it never closes."""
+    depth = 0
+    i = pos
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "{" or (char == opening and i == pos):
+            depth += 1
+        elif char == "}" or (char == closing and depth == 1):
+            depth -= 1
+            if depth == 0:
+                return i + 1
+            if depth < 0:
+                return None
+        i += 1
+    return None
+
+
+def _macro_end(text: str, pos: int, argspec: str) -> Optional[int]:
+    """
+    Position after the arguments that follow a macro name ending at pos,
+    parsed as the LatexWalker does; None when the walker's result is not
+    certain (a missing mandatory argument, an argument split by a blank line).
+    """
+    for arg in argspec:
+        start = _SPACE_RE.match(text, pos).end()
+        char = text[start:start + 1]
+        if arg == "*":
+            if char == "*":
+                pos = start + 1
+        elif arg == "[":
+            if char == "[":
+                pos = _closing(text, start, "[", "]")
+                if pos is None:
+                    return None
+        elif char == "{":
+            pos = _closing(text, start, "{", "}")
+            if pos is None:
+                return None
+        elif char == "\\":
+            token = MACRO_RE.match(text, start)
+            if token is None:
+                return None
+            pos = token.end()
+        elif not char or char in "}$%&#^_~\n":
+            return None
+        else:
+            pos = start + 1  # a single-character argument, as in \\frac12
+    return pos
+
+
+def _balanced(latex: str) -> bool:
+    depth = 0
+    for match in _BRACE_RE.finditer(latex):
+        depth += 1 if match.group() == "{" else -1
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def _regex_spans(text: str):
+    """
+    (kind, delimiter, start, end, latex) for every formula and macro of a
+    page, or None when the page needs the LatexWalker.
+    """
+    if _COMMENT_RE.search(text):
+        return None
+    math = []
+    last = 0
+    leftover = []
+    for match in MATH_RE.finditer(text):
+        group = match.lastgroup
+        latex = match.group(group)
+        if not _balanced(latex) or _TEXT_DOLLAR_RE.search(latex):
+            return None  # e.g. $a \text{if $b$}$ split at the inner "$"
+        math.append(("math", _DELIMITERS[group], match.start(), match.end(), latex))
+        leftover.append(text[last:match.start()])
+        last = match.end()
+    leftover.append(text[last:])
+    if any(_NEEDS_WALKER_RE.search(part) for part in leftover):
+        return None
+
+    spans = []
+    macro_end = 0
+    for match in MACRO_RE.finditer(text):
+        if match.start() < macro_end:
+            continue  # inside the arguments of the previous macro
+        argspec = _argspec(match.group()[1:])
+        if argspec is None:
+            return None
+        macro_end = _macro_end(text, match.end(), argspec)
+        if macro_end is None:
+            return None
+        spans.append(("macro", "", match.start(), macro_end, text[match.start():macro_end]))
+
+    # like the walker, math inside macro arguments (\textbf{$b$}) is not reported
+    arguments = [(start, end) for _, _, start, end, _ in spans if end > start + 2]
+    for span in math:
+        if not any(start < span[2] < end for start, end in arguments):
+            spans.append(span)
+    return spans
+
+
+def _walker_spans(text: str):
+    """Same spans as _regex_spans, from pylatexenc nodes walked with an explicit stack."""
+    walker = LatexWalker(text, tolerant_parsing=True)
+    nodes, _, _ = walker.get_latex_nodes()
+
+    spans = []
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        start, end = node.pos, node.pos + node.len
+        if isinstance(node, LatexMathNode):
+            opening, closing = node.delimiters
+            spans.append(("math", opening, start, end, text[start + len(opening):end - len(closing)]))
+        elif isinstance(node, LatexEnvironmentNode) and node.environmentname in MATH_ENVIRONMENTS:
+            children = [child for child in node.nodelist if child is not None]
+            latex = text[children[0].pos:children[-1].pos + children[-1].len] if children else ""
+            spans.append(("math", node.environmentname, start, end, latex))
+        elif isinstance(node, LatexMacroNode):
+            # the walker counts the whitespace after a macro; keep "\ " (control space) whole
+            end = start + max(len(text[start:end].rstrip()), 2)
+            spans.append(("macro", "", start, end, text[start:end]))
+        stack.extend(reversed(getattr(node, "nodelist", None) or []))
+    return spans
+
+
+def extract_page_latex(doc_id, page_index: int, text: str, fast: bool = True) -> List[Formula]:
+    """
+    Formulas and macros of one page, in reading order, with their line and
+    column. The regex path is used unless 'fast' is False or the page has
+    constructs it cannot delimit (see _NEEDS_WALKER_RE).
+    """
+    spans = _regex_spans(text) if fast else None
+    if spans is None:
+        spans = _walker_spans(text)
+    spans.sort(key=lambda span: span[2])
+
+    line_starts = _line_starts(text)
+    formulas = []
+    for kind, delimiter, start, end, latex in spans:
+        line = bisect_right(line_starts, start)
+        formulas.append(Formula(
+            doc_id, page_index, line, start - line_starts[line - 1] + 1,
+            start, end, latex.strip(), kind=kind, delimiter=delimiter,
+        ))
+    return formulas
+
+
+def iter_formulas(doc: Document, fast: bool = True) -> Iterator[Formula]:
+    """Formulas of a document, page by page."""
+    for page_index, page in enumerate(doc.pages):
+        yield from extract_page_latex(doc.id, page_index, page.content, fast)
+
+
+def iter_section_formulas(doc: Document, fast: bool = True, kinds=("math",)) -> Iterator[Tuple[int, List[Formula]]]:
+    """
+    (section index, formulas) for each of doc.sections, with offsets into
+    section.content (page_index is -1: a section may span several pages).
+    Only math by default, so spans never overlap.
+    """
+    for section_idx, section in enumerate(doc.sections):
+        formulas = extract_page_latex(doc.id, -1, section.content, fast)
+        yield section_idx, [formula for formula in formulas if formula.kind in kinds]
+
+
+def _group_formulas(formulas: Iterable[Formula]) -> dict:
+    math_expressions = []
+    macro_expressions = []
+    for formula in formulas:
+        if formula.kind == "math":
+            math_expressions.append(formula.latex)
+        else:
+            macro_expressions.append(formula.latex)
+    return {"math": math_expressions, "macros": macro_expressions}
+
 
 def extract_latex_from_doc(doc: Document) -> tuple:
     """
     Extract LaTeX content from a single document.
     Returns (doc.id, {"math": [...], "macros": [...]})
     """
-    walker = LatexWalker(doc.content)
-    nodes, pos, length = walker.get_latex_nodes()
+    return doc.id, _group_formulas(iter_formulas(doc))
 
-    math_expressions = []
-    macro_expressions = []
 
-    def walk(node):
-        if isinstance(node, LatexMathNode):
-            math_content = "".join(
-                child.latex_verbatim() for child in getattr(node, "nodelist", [])
-            )
-            math_expressions.append(math_content)
-        elif isinstance(node, LatexMacroNode):
-            if node.nodeargd:
-                args = "".join(
-                    arg.latex_verbatim() for arg in node.nodeargd.argnlist if arg
-                )
-                macro_expressions.append(f"\\{node.macroname}{args}")
-            else:
-                macro_expressions.append(f"\\{node.macroname}")
-        for child in getattr(node, "nodelist", []) or []:
-            walk(child)
+def page_payload_batches(documents: Iterable[Document], pages_per_task: int = 16) -> Iterator[List[PagePayload]]:
+    """
+    Pages of all documents as (doc_id, page_index, text) tuples, grouped
+    pages_per_task at a time. Pickling a Document would drag its whole
+    object graph (pages, chapters, sections) into the worker; the payloads
+    carry only the text.
+    """
+    batch: List[PagePayload] = []
+    for doc in documents:
+        for page_index, page in enumerate(doc.pages):
+            batch.append((doc.id, page_index, page.content))
+            if len(batch) >= pages_per_task:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
 
-    for node in nodes:
-        walk(node)
 
-    return doc.id, {"math": math_expressions, "macros": macro_expressions}
+def _extract_batch(batch: List[PagePayload]) -> List[Formula]:
+    formulas = []
+    for doc_id, page_index, text in batch:
+        formulas.extend(extract_page_latex(doc_id, page_index, text))
+    return formulas
 
 
-def extract_latex(documents: list[Document], max_workers: int = None) -> dict:
+def extract_formulas(
+    documents: List[Document],
+    max_workers: Optional[int] = None,
+    pages_per_task: int = 16,
+) -> List[Formula]:
     """
+    Formulas of every document, in document and page order. With
+    max_workers > 1 page batches are extracted in a process pool.
     """
-    latex_contents = {}
+    batches = page_payload_batches(documents, pages_per_task)
+    if max_workers is not None and max_workers <= 1:
+        return [formula for batch in batches for formula in _extract_batch(batch)]
 
+    batches = list(batches)
+    # a few map chunks per worker keeps the load balanced with little IPC
+    chunksize = max(1, len(batches) // (4 * (max_workers or os.cpu_count() or 1)))
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(extract_latex_from_doc, doc) for doc in documents]
-        for future in as_completed(futures):
-            doc_id, content = future.result()
-            latex_contents[doc_id] = content
+        results = executor.map(_extract_batch, batches, chunksize=chunksize)
+        return [formula for formulas in results for formula in formulas]
 
-    return latex_contents
+
+def extract_latex(documents: list[Document], max_workers: int = None, pages_per_task: int = 16) -> dict:
+    """
+    Extract LaTeX content from the documents' pages, in parallel.
+    Returns {doc.id: {"math": [...], "macros": [...]}}
+    """
+    by_document = {doc.id: [] for doc in documents}
+    for formula in extract_formulas(documents, max_workers, pages_per_task):
+        by_document[formula.doc_id].append(formula)
+    return {doc_id: _group_formulas(formulas) for doc_id, formulas in by_document.items()}
 
 def latex_verification():
-    sample_doc = Document(
-        source="sample.tex",
+    sample_doc = Document(name="sample", path="sample.tex")
+    sample_doc.pages.append(Page(
+        parent_document=sample_doc,
         content="""
         Here is some text with inline math $E=mc^2$ and display math:
         \\[
         \\int_a^b f(x) \\, dx = F(b) - F(a)
         \\]
         Also, a macro: \\newcommand{\\R}{\\mathbb{R}}
-        """
-    )
+        """,
+    ))
     result = extract_latex_from_doc(sample_doc)
     print(result)
+    for formula in iter_formulas(sample_doc):
+        print(formula)
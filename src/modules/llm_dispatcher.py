@@ -0,0 +1,132 @@
+import asyncio
+import contextlib
+import random
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+from ollama import AsyncClient, ResponseError
+
+Messages = List[Dict[str, str]]
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed request is worth sending again: timeouts, connection
+    errors and 429/5xx answers. Other answers (unknown model, bad request)
+    fail the same way every time.
+    """
+    if isinstance(error, ResponseError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError))
+
+
+class LLMDispatcher:
+    """
+    Sends many chat requests to an Ollama server concurrently.
+
+    At most 'concurrency' requests are in flight at once, over one pooled
+    httpx connection pool, opened for one run and closed at its end. Each
+    attempt is bounded by 'timeout' seconds, and requests that failed with a
+    transient error (see is_transient) are resubmitted up to 'max_retries'
+    times with exponential backoff (base 'backoff' seconds, jittered, capped
+    at 'max_backoff').
+    """
+
+    def __init__(
+        self,
+        model: str,
+        host: Optional[str] = None,
+        client=None,
+        concurrency: int = 4,
+        timeout: float = 120.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        options: Optional[dict] = None,
+    ):
+        self.model = model
+        self.host = host
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.options = options or {}
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _make_client(self):
+        # one pooled connection per concurrent request
+        return AsyncClient(
+            host=self.host,
+            limits=httpx.Limits(
+                max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+            ),
+        )
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """(client, semaphore) shared by the chat() calls of one run; a client opened here is closed on exit."""
+        if self.client is not None:
+            yield self.client, asyncio.Semaphore(self.concurrency)
+            return
+        client = self._make_client()
+        try:
+            yield client, asyncio.Semaphore(self.concurrency)
+        finally:
+            # ollama.AsyncClient has no close(); its httpx pool is _client
+            await client._client.aclose()
+
+    async def chat(self, client, semaphore: asyncio.Semaphore, messages: Messages) -> str:
+        """One request, retried as described above; raises once retries are exhausted."""
+        attempt = 0
+        while True:
+            try:
+                # the slot is only held while the request is on the wire, not during backoff
+                async with semaphore:
+                    self.requests += 1
+                    response = await asyncio.wait_for(
+                        client.chat(model=self.model, messages=messages, options=self.options),
+                        self.timeout,
+                    )
+                return (response["message"]["content"] or "").strip()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    self.failures += 1
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                delay *= 0.5 + random.random() / 2
+                attempt += 1
+                self.retries += 1
+                print(f"[LLM Dispatcher] Reintento {attempt}/{self.max_retries} en {delay:.1f}s: {e!r}")
+                await asyncio.sleep(delay)
+
+    async def run(self, requests: Sequence[Messages]) -> List[Optional[str]]:
+        """
+        Send every request and return the response texts in request order;
+        a request that still fails after all retries yields None.
+        """
+        async with self.session() as (client, semaphore):
+            results = await asyncio.gather(
+                *(self.chat(client, semaphore, messages) for messages in requests),
+                return_exceptions=True,
+            )
+
+        texts: List[Optional[str]] = []
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                print(f"[LLM Dispatcher] Solicitud {i + 1} falló: {result!r}")
+                texts.append(None)
+            else:
+                texts.append(result)
+        return texts
+
+    def run_sync(self, requests: Sequence[Messages]) -> List[Optional[str]]:
+        """Blocking wrapper around run() for the synchronous pipeline stages."""
+        return asyncio.run(self.run(requests))
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retries": self.retries, "failures": self.failures}
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from modules.save_contents import document_dirname
+from utils import verbose_print
+
+# Bump whenever a change in the pipeline changes the artifacts it writes,
+# so every book is reprocessed once on the next run.
+PIPELINE_VERSION = "1"
+
+
+class Manifest:
+    """
+    Record of the books already processed, stored as JSON in artifacts_path:
+        {"pipeline_version": "1",
+         "books": {"<book>": {"hash": "<sha256>", "files": {"<page file>": [size, mtime_ns]},
+                              "options": {...}}}}
+
+    A book is skipped when its page files hash to the recorded value under the
+    same pipeline version, it was processed with the same 'options' (the
+    config keys that change its outputs), and every one of its 'outputs'
+    (output_root/<book><suffix> for each (output_root, suffix), a folder or
+    a file) still exists. Page files whose size and mtime did not change are
+    not re-read to compute the hash.
+    """
+
+    def __init__(self, path: str, outputs: Sequence[Tuple[str, str]], options: Optional[dict] = None):
+        self.path = path
+        self.outputs = list(outputs)
+        self.options = options or {}
+        self.books: Dict[str, dict] = {}
+        # fingerprints of books queued for processing in this run
+        self._pending: Dict[str, dict] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("pipeline_version") == PIPELINE_VERSION:
+                self.books = data.get("books", {})
+            else:
+                print(f"[Manifest] Versión del pipeline cambió ({data.get('pipeline_version')} -> {PIPELINE_VERSION}), se reprocesan todos los libros")
+
+    @staticmethod
+    def _hash_files(page_files: List[os.DirEntry]) -> str:
+        digest = hashlib.sha256(PIPELINE_VERSION.encode("utf-8"))
+        for page_file in page_files:
+            digest.update(page_file.name.encode("utf-8") + b"\0")
+            with open(page_file.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def needs_processing(self, name: str, path: str, page_files: List[os.DirEntry]) -> bool:
+        """book_filter for text_extraction: True if the book is new or changed."""
+        files = {}
+        for page_file in page_files:
+            stat = page_file.stat()
+            files[page_file.name] = [stat.st_size, stat.st_mtime_ns]
+
+        recorded: Optional[dict] = self.books.get(name)
+        up_to_date = (
+            recorded is not None
+            and recorded.get("options", {}) == self.options
+            and all(
+                os.path.exists(os.path.join(root, document_dirname(name) + suffix))
+                for root, suffix in self.outputs
+            )
+        )
+
+        if up_to_date and recorded["files"] == files:
+            return False
+
+        book_hash = self._hash_files(page_files)
+        if up_to_date and recorded["hash"] == book_hash:
+            # touched but identical: refresh the stats so the next run skips the read
+            recorded["files"] = files
+            return False
+
+        verbose_print("[Manifest] Libro nuevo o modificado: %s", name)
+        self._pending[name] = {"hash": book_hash, "files": files, "options": self.options}
+        return True
+
+    def mark_processed(self, name: str) -> None:
+        """Record a book once its artifacts have been saved."""
+        entry = self._pending.pop(name, None)
+        if entry is not None:
+            self.books[name] = entry
+
+    def save(self) -> None:
+        data = {"pipeline_version": PIPELINE_VERSION, "books": self.books}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
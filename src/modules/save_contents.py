@@ -1,7 +1,12 @@
 import os
-from typing import List, Optional
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 
+from models.chapter import Chapter
 from models.document import Document
+from models.identifiers import stable_id
+from models.section import Section
 from utils import verbose_print
 
 
@@ -20,121 +25,219 @@ def _sanitize_filename_part(name: Optional[str], fallback: str) -> str:
     return safe or fallback
 
 
-# helper: ensure unique filepath (append _1, _2 if exists)
-def _unique_path(path: str) -> str:
+# helper: ensure unique path among the ones already planned (append _1, _2 if taken)
+def _unique_path(path: str, used: Set[str]) -> str:
     base, ext = os.path.splitext(path)
     candidate = path
     idx = 1
-    while os.path.exists(candidate):
+    while candidate in used:
         candidate = f"{base}_{idx}{ext}"
         idx += 1
+    used.add(candidate)
     return candidate
 
 
-def save_contents(documents: List[Document], artifacts_path: str) -> None:
+# helper: text of an orphan item or section part, which may be str or Content-like
+def _item_text(item) -> str:
+    if isinstance(item, str):
+        return item
+    return getattr(item, "content", str(item))
+
+
+def _section_text(section) -> str:
+    # prefer Section.content, else join section.contents list
+    if hasattr(section, "content") and section.content:
+        return section.content
+    return "\n\n".join(_item_text(c) for c in getattr(section, "contents", []))
+
+
+def _section_paths(document: Document, used: Set[str]) -> Iterator[Tuple[Chapter, Section, str]]:
+    # (chapter, section, path relative to the document folder) of every saved section
+    for chapter in getattr(document, "chapters", []):
+        chap_name_safe = _sanitize_filename_part(
+            getattr(chapter, "name", None), "untitled_chapter"
+        )
+        for section in getattr(chapter, "sections", []):
+            sec_name_safe = _sanitize_filename_part(
+                getattr(section, "name", None), f"section_{section.stable_id()}"
+            )
+            yield chapter, section, _unique_path(os.path.join(chap_name_safe, f"{sec_name_safe}.txt"), used)
+
+
+def section_paths(document: Document) -> List[Tuple[Section, str]]:
+    """(section, path relative to the document folder) as plan_document names them."""
+    used: Set[str] = {"orphan_contents.txt"} if getattr(document, "orphan_contents", []) else set()
+    return [(section, path) for _, section, path in _section_paths(document, used)]
+
+
+def plan_document(document: Document) -> List[Tuple[str, str]]:
+    """
+    Compute every file of a document as (path relative to the document folder, text),
+    resolving name collisions in memory instead of probing the filesystem.
+    """
+    files: List[Tuple[str, str]] = []
+    used: Set[str] = set()
+
+    # 1. Orphan contents (paragraphs not in any chapter/section)
+    orphan_contents = getattr(document, "orphan_contents", [])
+    if orphan_contents:
+        orphan_file = _unique_path("orphan_contents.txt", used)
+        files.append(
+            (orphan_file, "".join(_item_text(item) + "\n\n" for item in orphan_contents))
+        )
+        verbose_print(
+            "[Save Contents] Guardadas %d entradas huérfanas en %s",
+            len(orphan_contents),
+            orphan_file,
+        )
+
+    # 2. Chapters and their sections
+    for chapter, section, sec_path in _section_paths(document, used):
+        files.append((sec_path, _section_text(section)))
+        verbose_print(
+            "[Save Contents] Guardada sección '%s' del capítulo '%s' en %s",
+            getattr(section, "name", ""),
+            getattr(chapter, "name", ""),
+            sec_path,
+        )
+
+    # 3. A full copy of the document with all contents stitched together
+    parts: List[str] = []
+
+    # a. orphan contents first
+    for item in orphan_contents:
+        parts.append(_item_text(item))
+    # b. chapters and their sections
+    for chapter in getattr(document, "chapters", []):
+        chap_header = f"\n\n=== Chapter: {getattr(chapter, 'name', '')} ===\n"
+        parts.append(chap_header)
+        # iterate sections in order
+        for section in getattr(chapter, "sections", []):
+            sec_header = f"\n-- Section: {getattr(section, 'name', '')} --\n"
+            parts.append(sec_header)
+            parts.append(_section_text(section))
+
+    files.append((_unique_path("full.txt", used), "\n\n".join(parts)))
+    return files
+
+
+def document_dirname(name: Optional[str]) -> str:
+    """
+    File name stem of a document in every artifact folder (content_extraction/,
+    corpus/, json/, the manifest). A name that sanitizing changes gets a short
+    hash of the original name appended, so two books that sanitize alike
+    ("A:B", "A?B") never share a folder, and every module and every run,
+    whichever books it processes, derives the same name for a book.
+    """
+    safe = _sanitize_filename_part(name, "untitled_document")
+    if name and safe != name:
+        safe = f"{safe}_{stable_id(name)[:8]}"
+    return safe
+
+
+def _write_file(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class ArtifactWriter:
+    """
+    Writes documents under root/<document_name>/. All files of a book are
+    written by a thread pool into a hidden staging folder, which is renamed
+    into place only once every file is complete, so readers never see a
+    partially written book and re-runs replace the previous output.
+    """
+
+    def __init__(self, root: str, executor: ThreadPoolExecutor):
+        self.root = root
+        self.executor = executor
+
+    def submit(self, document: Document) -> Tuple[str, str, List[Future]]:
+        doc_dirname = document_dirname(getattr(document, "name", None))
+        staging_dir = os.path.join(self.root, f".{doc_dirname}.tmp-{os.getpid()}")
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+
+        files = plan_document(document)
+
+        # create every folder once, before any write is queued
+        for directory in sorted({os.path.dirname(path) for path, _ in files}):
+            os.makedirs(os.path.join(staging_dir, directory), exist_ok=True)
+
+        futures = [
+            self.executor.submit(_write_file, os.path.join(staging_dir, path), text)
+            for path, text in files
+        ]
+        return doc_dirname, staging_dir, futures
+
+    def commit(self, doc_dirname: str, staging_dir: str, futures: List[Future]) -> str:
+        wait(futures)
+        for future in futures:
+            future.result()  # re-raise write errors before publishing
+
+        doc_dir = os.path.join(self.root, doc_dirname)
+        if os.path.exists(doc_dir):
+            previous_dir = f"{staging_dir}.old"
+            os.rename(doc_dir, previous_dir)
+            os.rename(staging_dir, doc_dir)
+            shutil.rmtree(previous_dir)
+        else:
+            os.rename(staging_dir, doc_dir)
+
+        print(f"[Save Contents] Guardado documento completo en {os.path.join(doc_dir, 'full.txt')}")
+        return doc_dir
+
+
+def save_document(document: Document, root: str, max_workers: Optional[int] = None) -> None:
+    """
+    Save a single document under root/<document_name>/ (see save_contents).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = ArtifactWriter(root, executor)
+        writer.commit(*writer.submit(document))
+
+
+def _content_root(artifacts_path: str) -> str:
+    root = os.path.join(artifacts_path, "content_extraction")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def iter_save_contents(
+    documents: Iterable[Document], artifacts_path: str, max_workers: Optional[int] = None
+) -> Iterator[Document]:
+    """
+    Streaming variant of save_contents: save each document as soon as it is
+    received and yield it so the caller can report progress and drop it.
+    """
+    root = _content_root(artifacts_path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = ArtifactWriter(root, executor)
+        for document in documents:
+            writer.commit(*writer.submit(document))
+            yield document
+
+
+def save_contents(
+    documents: List[Document], artifacts_path: str, max_workers: Optional[int] = None
+) -> None:
     """
     Save the documents with their contents into a folder structure:
       artifacts_path/content_extraction/<document_name>/...
     - per-section files: <chapter>/<section>.txt
-    - orphan sections: orphan_sections/<section>.txt
     - orphan contents: orphan_contents.txt
     - full stitched file: full.txt
+    Files are written by a thread pool of max_workers (config["max_workers"]);
+    each book appears atomically once all its files are written.
     """
-    root = os.path.join(artifacts_path, "content_extraction")
-    os.makedirs(root, exist_ok=True)
-
-    for document in documents:
-        doc_dirname = _sanitize_filename_part(
-            getattr(document, "name", None), "untitled_document"
-        )
-        doc_dir = os.path.join(root, doc_dirname)
-        os.makedirs(doc_dir, exist_ok=True)
-
-        # 1. Orphan contents (paragraphs not in any chapter/section)
-        orphan_contents = getattr(document, "orphan_contents", [])
-        if orphan_contents:
-            orphan_file = os.path.join(doc_dir, "orphan_contents.txt")
-            orphan_file = _unique_path(orphan_file)
-            with open(orphan_file, "w", encoding="utf-8") as f:
-                for i, item in enumerate(orphan_contents, start=1):
-                    # item may be either str or Content-like
-                    if isinstance(item, str):
-                        text = item
-                    else:
-                        text = getattr(item, "content", str(item))
-                    f.write(text + "\n\n")
-            verbose_print(
-                f"[Save Contents] Guardadas {len(orphan_contents)} entradas huérfanas en {orphan_file}"
-            )
-
-        # 2. Chapters and their sections
-        for chapter in getattr(document, "chapters", []):
-            chap_name_safe = _sanitize_filename_part(
-                getattr(chapter, "name", None), "untitled_chapter"
-            )
-            chap_dir = os.path.join(doc_dir, chap_name_safe)
-            os.makedirs(chap_dir, exist_ok=True)
-
-            # Save each section inside chapter
-            for section in getattr(chapter, "sections", []):
-                sec_name_safe = _sanitize_filename_part(
-                    getattr(section, "name", None), f"section_{section.id[:8]}"
-                )
-                sec_path = os.path.join(chap_dir, f"{sec_name_safe}.txt")
-                sec_path = _unique_path(sec_path)
-
-                # gather text: prefer Section.content, else join section.contents list
-                content_text = ""
-                if hasattr(section, "content") and section.content:
-                    content_text = section.content
-                else:
-                    parts = []
-                    for c in getattr(section, "contents", []):
-                        if isinstance(c, str):
-                            parts.append(c)
-                        else:
-                            parts.append(getattr(c, "content", str(c)))
-                    content_text = "\n\n".join(parts)
-
-                with open(sec_path, "w", encoding="utf-8") as f:
-                    f.write(content_text)
-                verbose_print(
-                    f"[Save Contents] Guardada sección '{getattr(section, 'name', '')}' del capítulo '{getattr(chapter, 'name', '')}' en {sec_path}"
-                )
-
-        # save a full copy of the document with all contents stitched together
-        full_path = os.path.join(doc_dir, "full.txt")
-        full_path = _unique_path(full_path)
-        parts: List[str] = []
-
-        # a. orphan contents first
-        for item in orphan_contents:
-            if isinstance(item, str):
-                parts.append(item)
-            else:
-                parts.append(getattr(item, "content", str(item)))
-        # b. chapters and their sections
-        for chapter in getattr(document, "chapters", []):
-            chap_header = f"\n\n=== Chapter: {getattr(chapter, 'name', '')} ===\n"
-            parts.append(chap_header)
-            # iterate sections in order
-            for section in getattr(chapter, "sections", []):
-                sec_header = f"\n-- Section: {getattr(section, 'name', '')} --\n"
-                parts.append(sec_header)
-                if hasattr(section, "content") and section.content:
-                    parts.append(section.content)
-                else:
-                    subparts = []
-                    for c in getattr(section, "contents", []):
-                        if isinstance(c, str):
-                            subparts.append(c)
-                        else:
-                            subparts.append(getattr(c, "content", str(c)))
-                    parts.append("\n\n".join(subparts))
-
-        # write full file
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write("\n\n".join(parts))
-        print(f"[Save Contents] Guardado documento completo en {full_path}")
+    root = _content_root(artifacts_path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = ArtifactWriter(root, executor)
+        # queue the writes of every book first, then publish them in order
+        pending = [writer.submit(document) for document in documents]
+        for doc_dirname, staging_dir, futures in pending:
+            writer.commit(doc_dirname, staging_dir, futures)
 
     print("[Save Contents] Guardado de todos los documentos completado.")
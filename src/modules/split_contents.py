@@ -1,14 +1,58 @@
 import re
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from models.chapter import Chapter
 from models.document import Document
+from models.page import Page
 from models.section import Section
 
 from utils import verbose_print
 
 
-def split_contents(documents: List[Document]) -> List[Document]:
+HEADING_RE = re.compile(r"^(#+)\s*(.*)$")
+
+# One match per token of a page, scanned in a single pass:
+#   heading  a line whose first non-blank character is '#'
+#   blank    a run of whitespace-only lines (paragraph separator)
+#   text     a run of consecutive non-blank, non-heading lines
+PAGE_TOKEN_RE = re.compile(
+    r"(?P<heading>^[^\S\n]*#[^\n]*\n?)"
+    r"|(?P<blank>(?:^[^\S\n]*\n|^[^\S\n]+\Z)+)"
+    r"|(?P<text>(?:^(?![^\S\n]*#)[^\n]*\S[^\n]*(?:\n|\Z))+)",
+    re.MULTILINE,
+)
+# line breaks str.splitlines() honours besides "\n" and "\r\n"
+_OTHER_LINE_BREAKS_RE = re.compile("\r(?!\n)|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+# a line ending in '-' is joined to the next one without the hyphen
+_HYPHEN_BREAK_RE = re.compile(r"-[^\S\n]*\n\s*(?=\S)")
+
+
+def normalize_paragraph_text(text: str) -> str:
+    """
+    Join the raw text of consecutive lines into one paragraph: lines ending
+    in a hyphen are joined without it, every other line break and
+    whitespace run becomes a single space.
+    """
+    if "-" in text:
+        text = _HYPHEN_BREAK_RE.sub("", text)
+    # str.split() collapses whitespace runs several times faster than re.sub
+    return " ".join(text.split())
+
+
+def tokenize_page(text: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    (kind, start, end) spans of a page's headings, blank runs and text runs
+    (see PAGE_TOKEN_RE), in order. 'text' must only break lines with "\n"
+    or "\r\n".
+    """
+    for match in PAGE_TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        yield kind, match.start(kind), match.end(kind)
+
+
+def split_document(document: Document) -> Document:
     """
     Split document pages into chapters and sections (based on # rules) and
     accumulate the textual content for each section into Section.content.
@@ -19,241 +63,344 @@ def split_contents(documents: List[Document]) -> List[Document]:
     Implementation notes:
       - We treat blank lines (completely empty) as paragraph separators for nicer spacing,
         but we do NOT treat ordinary line-wrapping as paragraph boundary.
-      - Paragraph text is normalized into a single string per section.
+      - Paragraph text is normalized and appended to Section.paragraphs; Section.content
+        joins them once, when it is read.
+      - Each page is tokenized in one regex pass (tokenize_page); text runs are kept
+        as slices until their paragraph is flushed.
       - Pages are assigned to the active section/chapter (Section.pages / Chapter.pages).
       - Orphan content (no chapter/section) is stored in document.orphan_contents (list[str]).
     """
 
-    heading_re = re.compile(r"^(#+)\s*(.*)$")
-
-    def normalize_joined_paragraph(lines: List[str]) -> str:
-        """
-        Join a list of lines into a normalized paragraph string.
-        - Remove leading/trailing whitespace per line.
-        - If a line ends with a hyphen (word-split), join without hyphen and without extra space.
-        - Otherwise join lines with single spaces.
-        - Collapse multiple internal whitespace into single spaces.
-        """
-        if not lines:
-            return ""
-        joined_parts: List[str] = []
-        for i, raw in enumerate(lines):
-            s = raw.strip()
-            if not s:
-                continue
-            if joined_parts and joined_parts[-1].endswith("-"):
-                # remove trailing hyphen and join directly
-                joined_parts[-1] = joined_parts[-1][:-1] + s
-            else:
-                joined_parts.append(s)
-        # join with spaces and collapse multiple spaces
-        text = " ".join(joined_parts)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
+    current_chapter: Chapter | None = None
+    # stack of (level, Section) to support nested subsections
+    section_stack: List[Tuple[int, Section]] = []
+    current_section: Section | None = None
 
-    for document in documents:
-        # ensure container attributes exist
-        document.chapters = getattr(document, "chapters", [])
-        document.sections = getattr(document, "sections", [])
-        document.pages = getattr(document, "pages", [])
-        document.orphan_contents = getattr(document, "orphan_contents", [])
-        document.orphan_sections = getattr(document, "orphan_sections", [])
-
-        current_chapter: Chapter | None = None
-        # stack of (level, Section) to support nested subsections
-        section_stack: List[Tuple[int, Section]] = []
-        current_section: Section | None = None
-
-        # paragraph buffer persists across page boundaries unless a strong delimiter (heading or blank line) is seen
-        paragraph_buffer: List[str] = []
-
-        def flush_paragraph_buffer():
-            nonlocal paragraph_buffer, current_section, current_chapter
-            if not paragraph_buffer:
-                return
-            paragraph_text = normalize_joined_paragraph(paragraph_buffer)
-            paragraph_buffer = []
-            if not paragraph_text:
-                return
+    # paragraph buffer persists across page boundaries unless a strong delimiter (heading or blank line) is seen;
+    # it holds raw text runs, each ending with a line break
+    paragraph_buffer: List[str] = []
+    # (index in paragraph_buffer, page) of the first run of each page in the buffer
+    buffer_pages: List[Tuple[int, Page]] = []
 
-            if current_section is not None:
-                # attach to section.content
-                current_section.content = getattr(current_section, "content", "")
-                if current_section.content:
-                    current_section.content += "\n\n" + paragraph_text
-                else:
-                    current_section.content = paragraph_text
+    def flush_paragraph_buffer():
+        nonlocal paragraph_buffer, buffer_pages, current_section, current_chapter
+        if not paragraph_buffer:
+            return
+        paragraph_text = normalize_paragraph_text("".join(paragraph_buffer))
+        # where each page starts in the normalized text: a non-blank marker
+        # appended to the raw text before it ends up at that offset
+        paragraph_pages = [
+            (len(normalize_paragraph_text("".join(paragraph_buffer[:idx]) + "\x00")) - 1 if idx else 0, buffer_page)
+            for idx, buffer_page in buffer_pages
+        ]
+        paragraph_buffer = []
+        buffer_pages = []
+        if not paragraph_text:
+            return
+
+        if current_section is not None:
+            # attach to section.content
+            current_section.add_paragraph(paragraph_text, paragraph_pages)
+            verbose_print(
+                "[Split Contents] Appended paragraph to section '%s' in document '%s'",
+                current_section.name,
+                document.name,
+            )
+        elif current_chapter is not None:
+            # create or get fallback orphan-section inside chapter
+            fallback = None
+            for sec in current_chapter.sections:
+                if sec.name.startswith("(orphan-section"):
+                    fallback = sec
+                    break
+            if fallback is None:
+                fallback_name = "(orphan-section)"
+                fallback = Section(
+                    source_chapter=current_chapter,
+                    source_document=document,
+                    name=fallback_name,
+                    position=len(document.sections),
+                )
+                current_chapter.sections.append(fallback)
+                document.sections.append(fallback)
                 verbose_print(
-                    f"[Split Contents] Appended paragraph to section '{getattr(current_section, 'name', '')}' in document '{document.name}'"
+                    "[Split Contents] Created fallback section for orphan content in chapter '%s'",
+                    current_chapter.name,
                 )
-            elif current_chapter is not None:
-                # create or get fallback orphan-section inside chapter
-                fallback = None
-                for sec in getattr(current_chapter, "sections", []):
-                    if getattr(sec, "name", "").startswith("(orphan-section"):
-                        fallback = sec
-                        break
-                if fallback is None:
-                    fallback_name = "(orphan-section)"
-                    fallback = Section(
-                        source_chapter=current_chapter,
-                        source_document=document,
-                        name=fallback_name,
-                    )
-                    fallback.pages = getattr(fallback, "pages", [])
-                    fallback.content = getattr(fallback, "content", "")
-                    current_chapter.sections = getattr(current_chapter, "sections", [])
-                    current_chapter.sections.append(fallback)
-                    document.sections.append(fallback)
+            # append text to fallback
+            fallback.add_paragraph(paragraph_text, paragraph_pages)
+            # also set current_section to fallback so subsequent content goes there
+            current_section = fallback
+            verbose_print(
+                "[Split Contents] Added orphan paragraph to fallback in chapter '%s'",
+                current_chapter.name,
+            )
+        else:
+            # truly orphan (no chapter/section)
+            document.orphan_contents.append(paragraph_text)
+            verbose_print(
+                "[Split Contents] Added orphan paragraph (no chapter/section) in document '%s'",
+                document.name,
+            )
+
+    # iterate pages in order (assumed document.pages is ordered)
+    for page in document.pages:
+        content = page.content
+        if _OTHER_LINE_BREAKS_RE.search(content):
+            # keep the final line break: a trailing empty line still ends the paragraph
+            content = "\n".join(content.splitlines()) + "\n"
+        # page-level flag: if we create a heading inside this page, we will consider that the page belongs
+        page_triggered_section = False
+
+        for kind, start, end in tokenize_page(content):
+            if kind == "text":
+                # normal lines -> buffer (do NOT flush at page end; only on blank line or heading)
+                if not buffer_pages or buffer_pages[-1][1] is not page:
+                    buffer_pages.append((len(paragraph_buffer), page))
+                paragraph_buffer.append(content[start:end])
+                if content[end - 1] != "\n":
+                    paragraph_buffer.append("\n")
+                continue
+
+            # blank line: mark paragraph separation (flush)
+            if kind == "blank":
+                flush_paragraph_buffer()
+                continue
+
+            # Heading
+            m = HEADING_RE.match(content[start:end].strip())
+            if m:
+                # flush any pending paragraph before switching context
+                flush_paragraph_buffer()
+
+                hashes = m.group(1)
+                level = len(hashes)
+                heading_text = m.group(2).strip()
+
+                if level == 2:
+                    # exactly '##' -> Chapter
+                    chapter = Chapter(source_document=document, name=heading_text)
+                    document.chapters.append(chapter)
+                    current_chapter = chapter
+                    # reset section stack and current_section
+                    section_stack = []
+                    current_section = None
                     verbose_print(
-                        f"[Split Contents] Created fallback section for orphan content in chapter '{getattr(current_chapter, 'name', '')}'"
+                        "[Split Contents] Created chapter '%s' in document '%s'",
+                        heading_text,
+                        document.name,
                     )
-                # append text to fallback
-                fallback.content = getattr(fallback, "content", "")
-                if fallback.content:
-                    fallback.content += "\n\n" + paragraph_text
+                    # page belongs to chapter (but not to any section yet)
+                    chapter.add_page(page)
+                    page_triggered_section = True
                 else:
-                    fallback.content = paragraph_text
-                # also set current_section to fallback so subsequent content goes there
-                current_section = fallback
-                verbose_print(
-                    f"[Split Contents] Added orphan paragraph to fallback in chapter '{getattr(current_chapter, 'name', '')}'"
-                )
-            else:
-                # truly orphan (no chapter/section)
-                document.orphan_contents.append(paragraph_text)
-                verbose_print(
-                    f"[Split Contents] Added orphan paragraph (no chapter/section) in document '{document.name}'"
-                )
+                    # it's a section/subsection (any # but not ##)
+                    new_section = Section(
+                        source_chapter=current_chapter,
+                        source_document=document,
+                        name=heading_text,
+                        position=len(document.sections),
+                    )
 
-        # iterate pages in order (assumed document.pages is ordered)
-        for page in document.pages:
-            # Guard: ensure page has the parent_document attribute and is Page-like
-            if not hasattr(page, "content"):
-                continue
+                    # attach to document.sections
+                    document.sections.append(new_section)
+
+                    # find parent via section_stack (closest level < current level)
+                    parent_index = None
+                    for idx in range(len(section_stack) - 1, -1, -1):
+                        if section_stack[idx][0] < level:
+                            parent_index = idx
+                            break
 
-            lines = page.content.splitlines()
-            # page-level flag: if we create a heading inside this page, we will consider that the page belongs
-            page_triggered_section = False
-
-            for raw_line in lines:
-                # keep line as-is but stripped for heading detection
-                line = raw_line.rstrip("\r\n")
-                stripped = line.strip()
-
-                # Heading detection
-                m = heading_re.match(stripped)
-                if m:
-                    # flush any pending paragraph before switching context
-                    flush_paragraph_buffer()
-
-                    hashes = m.group(1)
-                    level = len(hashes)
-                    heading_text = m.group(2).strip()
-
-                    if level == 2:
-                        # exactly '##' -> Chapter
-                        chapter = Chapter(source_document=document, name=heading_text)
-                        chapter.sections = getattr(chapter, "sections", [])
-                        chapter.pages = getattr(chapter, "pages", [])
-                        document.chapters.append(chapter)
-                        current_chapter = chapter
-                        # reset section stack and current_section
-                        section_stack = []
-                        current_section = None
+                    if parent_index is not None:
+                        parent_section = section_stack[parent_index][1]
+                        parent_section.subsections.append(new_section)
                         verbose_print(
-                            f"[Split Contents] Created chapter '{heading_text}' in document '{document.name}'"
+                            "[Split Contents] Created subsection '%s' (level %d) under '%s' in document '%s'",
+                            heading_text,
+                            level,
+                            parent_section.name,
+                            document.name,
                         )
-                        # page belongs to chapter (but not to any section yet)
-                        chapter.pages.append(page)
-                        page_triggered_section = True
                     else:
-                        # it's a section/subsection (any # but not ##)
-                        new_section = Section(
-                            source_chapter=current_chapter,
-                            source_document=document,
-                            name=heading_text,
-                        )
-                        new_section.pages = getattr(new_section, "pages", [])
-                        new_section.content = getattr(new_section, "content", "")
-
-                        # attach to document.sections
-                        document.sections.append(new_section)
-
-                        # find parent via section_stack (closest level < current level)
-                        parent_index = None
-                        for idx in range(len(section_stack) - 1, -1, -1):
-                            if section_stack[idx][0] < level:
-                                parent_index = idx
-                                break
-
-                        if parent_index is not None:
-                            parent_section = section_stack[parent_index][1]
-                            parent_section.subsections = getattr(
-                                parent_section, "subsections", []
-                            )
-                            parent_section.subsections.append(new_section)
+                        # attach to current_chapter if present; otherwise to document orphan sections
+                        if current_chapter is not None:
+                            current_chapter.sections.append(new_section)
                             verbose_print(
-                                f"[Split Contents] Created subsection '{heading_text}' (level {level}) under '{getattr(parent_section, 'name', '')}' in document '{document.name}'"
+                                "[Split Contents] Created section '%s' (level %d) in chapter '%s' in document '%s'",
+                                heading_text,
+                                level,
+                                current_chapter.name,
+                                document.name,
                             )
                         else:
-                            # attach to current_chapter if present; otherwise to document orphan sections
-                            if current_chapter is not None:
-                                current_chapter.sections = getattr(
-                                    current_chapter, "sections", []
-                                )
-                                current_chapter.sections.append(new_section)
-                                verbose_print(
-                                    f"[Split Contents] Created section '{heading_text}' (level {level}) in chapter '{getattr(current_chapter, 'name', '')}' in document '{document.name}'"
-                                )
-                            else:
-                                document.orphan_sections.append(new_section)
-                                verbose_print(
-                                    f"[Split Contents] Created orphan section '{heading_text}' (level {level}) in document '{document.name}'"
-                                )
-
-                        # update stack and current_section
-                        while section_stack and section_stack[-1][0] >= level:
-                            section_stack.pop()
-                        section_stack.append((level, new_section))
-                        current_section = new_section
-
-                        # assign the current page to this section
-                        current_section.pages.append(page)
-                        page_triggered_section = True
-
-                    # heading line does not count as paragraph content; continue to next line
-                    continue
-
-                # blank line: mark paragraph separation (flush)
-                if stripped == "":
-                    flush_paragraph_buffer()
-                    continue
-
-                # normal line -> buffer (do NOT flush at page end; only on blank line or heading)
-                paragraph_buffer.append(line)
-
-            # end of page lines
-            # If the page did not create/trigger a section but we have a current_section, ensure page is added to it.
-            if not page_triggered_section:
-                if current_section is not None:
-                    if page not in current_section.pages:
-                        current_section.pages.append(page)
-                elif current_chapter is not None:
-                    # page belongs to chapter pages (but not to any section)
-                    if page not in current_chapter.pages:
-                        current_chapter.pages.append(page)
-                else:
-                    # no chapter/section yet -> this page content will end up as orphan when flushed
-                    pass
-            # DO NOT flush paragraph_buffer here; allow flow across page boundaries
+                            document.orphan_sections.append(new_section)
+                            verbose_print(
+                                "[Split Contents] Created orphan section '%s' (level %d) in document '%s'",
+                                heading_text,
+                                level,
+                                document.name,
+                            )
+
+                    # update stack and current_section
+                    while section_stack and section_stack[-1][0] >= level:
+                        section_stack.pop()
+                    section_stack.append((level, new_section))
+                    current_section = new_section
+
+                    # assign the current page to this section
+                    current_section.add_page(page)
+                    page_triggered_section = True
+
+        # end of page tokens
+        # If the page did not create/trigger a section but we have a current_section, ensure page is added to it.
+        if not page_triggered_section:
+            if current_section is not None:
+                current_section.add_page(page)
+            elif current_chapter is not None:
+                # page belongs to chapter pages (but not to any section)
+                current_chapter.add_page(page)
+            else:
+                # no chapter/section yet -> this page content will end up as orphan when flushed
+                pass
+        # DO NOT flush paragraph_buffer here; allow flow across page boundaries
+
+    # finished iterating pages for document -> flush remaining buffered paragraph (end of doc)
+    flush_paragraph_buffer()
+
+    verbose_print(
+        "[Split Contents] Finished splitting document '%s'. Chapters: %d, Sections: %d, Orphan paragraphs: %d",
+        document.name,
+        len(document.chapters),
+        len(document.sections),
+        len(document.orphan_contents),
+    )
+
+    return document
+
+
+def _compact_split(document: Document) -> dict:
+    """
+    Picklable summary of a split document: chapters and sections refer to
+    pages and to each other by index, with no back-references to Document/Page.
+    """
+    page_index = {page: i for i, page in enumerate(document.pages)}
+    chapter_index = {chapter: i for i, chapter in enumerate(document.chapters)}
+    section_index = {section: i for i, section in enumerate(document.sections)}
+
+    return {
+        "chapters": [
+            (
+                chapter.name,
+                [page_index[page] for page in chapter.pages],
+                [section_index[section] for section in chapter.sections],
+            )
+            for chapter in document.chapters
+        ],
+        "sections": [
+            (
+                section.name,
+                chapter_index.get(section.source_chapter),
+                section.paragraphs,
+                [page_index[page] for page in section.pages],
+                [(offset, page_index[page]) for offset, page in section.page_starts],
+                [section_index[sub] for sub in section.subsections],
+            )
+            for section in document.sections
+        ],
+        "orphan_sections": [section_index[section] for section in document.orphan_sections],
+        "orphan_contents": document.orphan_contents,
+    }
+
 
-        # finished iterating pages for document -> flush remaining buffered paragraph (end of doc)
-        flush_paragraph_buffer()
+def _split_worker(name: str, page_texts: List[str]) -> dict:
+    # Runs in a worker process: rebuild a bare document from the page texts only
+    document = Document(name=name, path="")
+    document.pages = [Page(parent_document=None, content=text) for text in page_texts]
+    return _compact_split(split_document(document))
 
-        verbose_print(
-            f"[Split Contents] Finished splitting document '{document.name}'. Chapters: {len(getattr(document, 'chapters', []))}, Sections: {len(getattr(document, 'sections', []))}, Orphan paragraphs: {len(getattr(document, 'orphan_contents', []))}"
+
+def _attach_split(document: Document, result: dict) -> Document:
+    """Rebuild the chapter/section tree of a worker result on the original document."""
+    pages = document.pages
+    document.chapters = [Chapter(source_document=document, name=name) for name, _, _ in result["chapters"]]
+
+    document.sections = []
+    for name, chapter_idx, paragraphs, page_idxs, page_starts, _ in result["sections"]:
+        section = Section(
+            source_chapter=document.chapters[chapter_idx] if chapter_idx is not None else None,
+            source_document=document,
+            name=name,
+            position=len(document.sections),
         )
+        for paragraph in paragraphs:
+            section.add_paragraph(paragraph)
+        for idx in page_idxs:
+            section.add_page(pages[idx])
+        section.page_starts = [(offset, pages[idx]) for offset, idx in page_starts]
+        document.sections.append(section)
+
+    for section, (*_, subsection_idxs) in zip(document.sections, result["sections"]):
+        if subsection_idxs:
+            section.subsections = [document.sections[idx] for idx in subsection_idxs]
+
+    for chapter, (_, page_idxs, section_idxs) in zip(document.chapters, result["chapters"]):
+        for idx in page_idxs:
+            chapter.add_page(pages[idx])
+        chapter.sections = [document.sections[idx] for idx in section_idxs]
+
+    document.orphan_sections = [document.sections[idx] for idx in result["orphan_sections"]]
+    document.orphan_contents = result["orphan_contents"]
+    return document
+
+
+def _iter_split_parallel(documents: Iterable[Document], max_workers: int) -> Iterator[Document]:
+    """
+    Fan documents out to a process pool, keeping at most 2 * max_workers books
+    in flight, and yield them in input order once their tree is re-attached.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for document in documents:
+            page_texts = [page.content for page in document.pages]
+            pending.append((document, executor.submit(_split_worker, document.name, page_texts)))
+            if len(pending) >= 2 * max_workers:
+                document, future = pending.popleft()
+                yield _attach_split(document, future.result())
+
+        while pending:
+            document, future = pending.popleft()
+            yield _attach_split(document, future.result())
+
+
+def iter_split_contents(
+    documents: Iterable[Document], max_workers: Optional[int] = None
+) -> Iterator[Document]:
+    """
+    Streaming variant of split_contents: split each document as soon as it is
+    received from the upstream stage and yield it right away.
+    With max_workers > 1 books are split in a process pool.
+    """
+    if max_workers is not None and max_workers > 1:
+        yield from _iter_split_parallel(documents, max_workers)
+        return
+
+    for document in documents:
+        yield split_document(document)
+
+
+def split_contents(documents: List[Document], max_workers: Optional[int] = None) -> List[Document]:
+    """
+    Split every document into chapters and sections (see split_document).
+    With max_workers > 1 (config["max_workers"]) independent books are split
+    in parallel in a process pool.
+    """
+    if max_workers is not None and max_workers > 1 and len(documents) > 1:
+        for _ in _iter_split_parallel(documents, max_workers):
+            pass
+    else:
+        for document in documents:
+            split_document(document)
 
     print("[Split Contents] Completed splitting contents for all documents.")
     return documents
@@ -0,0 +1,112 @@
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules.translation_cache import normalize_latex
+
+DEFAULT_SOURCES = ("well-known-latex.json", "latex_symbols_english.txt")
+
+# spacing commands carry no meaning in the English rendering
+_SPACING = r"\s+|\\[,;:! ]|~|\\quad(?![A-Za-z])|\\qquad(?![A-Za-z])"
+_NUMBER = r"\d+(?:\.\d+)?"
+_VARIABLE = r"[A-Za-z]"
+
+
+def _symbol_pattern(symbol: str) -> str:
+    # "\in" must not match the start of "\int"
+    pattern = re.escape(symbol)
+    if symbol.startswith("\\") and symbol[-1].isalpha():
+        pattern += r"(?![A-Za-z])"
+    return pattern
+
+
+class SymbolDictionary:
+    """
+    Translates simple formulas ("$X$", "$\\pi$", "$x \\leq \\infty$") without
+    the LLM. The symbol table is compiled once into a single regex that
+    splits a formula into known symbols, single-letter variables, numbers and
+    spacing; a formula with any other token (braces, sub/superscripts,
+    unknown commands) is left for the LLM.
+    """
+
+    def __init__(self, symbols: Dict[str, str]):
+        self.symbols = {normalize_latex(k): v for k, v in symbols.items() if k.strip() and v.strip()}
+        # longest symbols first so "\leq" wins over "\le"
+        known = "|".join(_symbol_pattern(s) for s in sorted(self.symbols, key=len, reverse=True))
+        self._token_re = re.compile(
+            (f"(?P<known>{known})|" if known else "")
+            + f"(?P<space>{_SPACING})|(?P<number>{_NUMBER})|(?P<variable>{_VARIABLE})|(?P<other>.)",
+            re.DOTALL,
+        )
+        self.lookups = 0
+        self.resolved = 0
+
+    @classmethod
+    def load(cls, paths: Iterable[str] = DEFAULT_SOURCES) -> "SymbolDictionary":
+        """
+        Build the table from JSON files: either one object ({latex: english})
+        or one object per line, as translate.py writes them. Missing or empty
+        files are skipped; earlier paths win over later ones.
+        """
+        symbols: Dict[str, str] = {}
+        for path in reversed(list(paths)):
+            if not os.path.isfile(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read().strip()
+            if not text:
+                continue
+            try:
+                objects = [json.loads(text)]
+            except json.JSONDecodeError:
+                objects = []
+                for line in text.splitlines():
+                    try:
+                        objects.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            for obj in objects:
+                if isinstance(obj, dict):
+                    symbols.update({str(k): str(v) for k, v in obj.items()})
+        return cls(symbols)
+
+    def translate(self, latex: str) -> Optional[str]:
+        """English for a formula made only of known tokens, None otherwise."""
+        self.lookups += 1
+        words: List[str] = []
+        for match in self._token_re.finditer(normalize_latex(latex)):
+            kind = match.lastgroup
+            if kind == "other":
+                return None
+            if kind == "known":
+                words.append(self.symbols[match.group()])
+            elif kind != "space":
+                words.append(match.group())
+        if not words:
+            return None
+        self.resolved += 1
+        return " ".join(words).replace(" ,", ",")
+
+    def split(self, latex_list: Iterable[str]) -> Tuple[Dict[str, str], List[str]]:
+        """({latex: english} resolved locally, formulas left for the LLM)."""
+        resolved: Dict[str, str] = {}
+        residual: List[str] = []
+        for latex in latex_list:
+            english = self.translate(latex)
+            if english is None:
+                residual.append(latex)
+            else:
+                resolved[latex] = english
+        return resolved, residual
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self.symbols),
+            "lookups": self.lookups,
+            "resolved": self.resolved,
+            "offloaded": round(self.resolved / self.lookups, 3) if self.lookups else 0.0,
+        }
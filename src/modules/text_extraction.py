@@ -1,57 +1,213 @@
 import os
 import re
-from typing import List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from utils import verbose_print
 from models.document import Document
-from models.page import Page
+from models.page import LazyPage, Page, PageCache
 
-def text_extraction(document_types: List[str], documents_path: str) -> List[Document]:
+PAGE_NUMBER_RE = re.compile(r'_page_(\d+)')
+
+# book_filter(book_name, book_path, page_files) -> False to skip the book without reading it
+BookFilter = Callable[[str, str, List[os.DirEntry]], bool]
+
+
+def _scan_documents(documents_path: str) -> List[os.DirEntry]:
+    # scandir returns the entry type with the listing, no extra stat per folder
+    with os.scandir(documents_path) as entries:
+        return [entry for entry in entries if entry.is_dir()]
+
+
+def _scan_page_files(document_path: str, document_types: List[str]) -> List[os.DirEntry]:
+    with os.scandir(document_path) as entries:
+        page_files = [
+            entry for entry in entries
+            if entry.name.split(".")[-1] in document_types
+        ]
+
+    # Sort pages by the number in the filename (e.g., _page_1)
+    page_files.sort(key=_page_number)
+    return page_files
+
+
+def _page_number(entry: os.DirEntry) -> int:
+    return int(PAGE_NUMBER_RE.search(entry.name).group(1))
+
+
+def _read_page(page_path: str) -> str:
+    with open(page_path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def _submit_document(
+    entry: os.DirEntry, page_files: List[os.DirEntry], executor: ThreadPoolExecutor
+) -> Tuple[Document, List[os.DirEntry], List[Future]]:
+    """Queue the reads of every page of a book; results are collected in page order."""
+    document = Document(name=entry.name, path=entry.path)
+    futures = [executor.submit(_read_page, page.path) for page in page_files]
+    return document, page_files, futures
+
+
+def _scan_document(
+    entry: os.DirEntry, page_files: List[os.DirEntry], page_cache: Optional[PageCache]
+) -> Document:
+    """Metadata-only load: pages record their file and size, text is read on first access."""
+    document = Document(name=entry.name, path=entry.path)
+    for page_file in page_files:
+        document.pages.append(
+            LazyPage(
+                parent_document=document,
+                path=page_file.path,
+                length=page_file.stat().st_size,
+                cache=page_cache,
+                number=_page_number(page_file),
+            )
+        )
+    return document
+
+
+def _collect_document(
+    document: Document, page_files: List[os.DirEntry], futures: List[Future]
+) -> Document:
+    # Create Page objects in order, regardless of which read finished first
+    for page_file, future in zip(page_files, futures):
+        current_page = Page(
+            parent_document=document,
+            content=future.result(),
+            number=_page_number(page_file),
+        )
+        document.pages.append(current_page)
+        verbose_print("[Text Extraction] Loaded page: %s from document: %s", page_file.name, document.name)
+    return document
+
+
+def load_document(
+    document_types: List[str],
+    document_path: str,
+    max_workers: Optional[int] = None,
+) -> Document:
     """
-    Etapa 1: Cargar documentos de texto desde el directorio especificado.
-    Soporta archivos con extensiones definidas en 'document_types'.
-    Almacena el contenido de los documentos en una lista para procesamiento posterior.
+    Etapa 1 para un solo libro: leer las páginas de 'document_path' sin
+    recorrer el resto de la biblioteca. FileNotFoundError si la carpeta no existe.
+    """
+    document = Document(name=os.path.basename(os.path.normpath(document_path)), path=document_path)
+    page_files = _scan_page_files(document_path, document_types)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_read_page, page.path) for page in page_files]
+        return _collect_document(document, page_files, futures)
+
+
+def iter_text_extraction(
+    document_types: List[str],
+    documents_path: str,
+    max_workers: Optional[int] = None,
+    prefetch: Optional[int] = 1,
+    lazy: bool = False,
+    page_cache: Optional[PageCache] = None,
+    book_filter: Optional[BookFilter] = None,
+) -> Iterator[Document]:
+    """
+    Etapa 1 (modo streaming): Cargar los documentos uno por uno.
+    Cada libro se entrega en cuanto sus páginas están leídas, por lo que solo un
+    libro reside en memoria a la vez si el consumidor no guarda referencias.
+    Las páginas se leen en paralelo con un pool de hilos; mientras se entrega un
+    libro, las lecturas de los siguientes 'prefetch' libros ya están en curso.
 
     Args:
         document_types (List[str]): Lista de extensiones de archivo soportadas (ej. ["txt", "md"]).
         documents_path (str): Ruta al directorio que contiene los documentos.
+        max_workers (Optional[int]): Hilos de lectura (config["max_workers"]).
+        prefetch (Optional[int]): Libros leídos por adelantado; None para leer todos a la vez.
+        lazy (bool): Solo escanear los directorios; las páginas (LazyPage) leen su
+            archivo al primer acceso y se mantienen en 'page_cache'.
+        page_cache (Optional[PageCache]): Caché LRU de páginas decodificadas para el modo lazy.
+        book_filter (Optional[BookFilter]): Se llama con la lista de páginas de cada libro
+            antes de leerlas; si devuelve False el libro se omite (ej. Manifest.needs_processing).
 
-    Returns:
-        List[Document]: Lista de objetos Document con el contenido extraído.
+    Yields:
+        Document: Documento con sus páginas cargadas en orden.
     """
 
-    documents: list[Document] = []
-    pages: list[Page] = []
+    documents_count = 0
+    pages_count = 0
+    skipped_count = 0
 
-    # List out all of the "Documents"
-    for document in os.listdir(documents_path):
-        document_path = os.path.join(documents_path, document)
-        if not os.path.isdir(document_path):
-            continue  # Skip non-folder items
+    def books():
+        nonlocal skipped_count
+        for entry in _scan_documents(documents_path):
+            page_files = _scan_page_files(entry.path, document_types)
+            if book_filter is not None and not book_filter(entry.name, entry.path, page_files):
+                skipped_count += 1
+                verbose_print("[Text Extraction] Skipped unchanged document: %s", entry.name)
+                continue
+            yield entry, page_files
 
-        current_document = Document(name=document, path=document_path)
+    if lazy:
+        for entry, page_files in books():
+            current_document = _scan_document(entry, page_files, page_cache)
+            documents_count += 1
+            pages_count += len(current_document.pages)
+            yield current_document
 
-        # List and sort all of the "Pages" numerically
-        page_files = [
-            f for f in os.listdir(document_path)
-            if f.split(".")[-1] in document_types
-        ]
+        print(f"[Text Extraction] Indexed {documents_count} documents with a total of {pages_count} pages (lazy, {skipped_count} skipped).")
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        # List out all of the "Documents"
+        for entry, page_files in books():
+            pending.append(_submit_document(entry, page_files, executor))
+            if prefetch is not None and len(pending) > prefetch:
+                current_document = _collect_document(*pending.popleft())
+                documents_count += 1
+                pages_count += len(current_document.pages)
+                yield current_document
+
+        while pending:
+            current_document = _collect_document(*pending.popleft())
+            documents_count += 1
+            pages_count += len(current_document.pages)
+            yield current_document
 
-        # Sort pages by the number in the filename (e.g., _page_1)
-        page_files.sort(key=lambda x: int(re.search(r'_page_(\d+)', x).group(1)))
+    print(f"[Text Extraction] Loaded {documents_count} documents with a total of {pages_count} pages ({skipped_count} skipped).")
 
-        # Create Page objects in order
-        for page_file in page_files:
-            page_path = os.path.join(document_path, page_file)
-            with open(page_path, "r", encoding="utf-8") as file:
-                content = file.read()
-                current_page = Page(parent_document=current_document, content=content)
-                current_document.pages.append(current_page)
-                pages.append(current_page)
-                verbose_print(f"[Text Extraction] Loaded page: {page_file} from document: {document}")
 
-        documents.append(current_document)
+def text_extraction(
+    document_types: List[str],
+    documents_path: str,
+    max_workers: Optional[int] = None,
+    lazy: bool = False,
+    page_cache: Optional[PageCache] = None,
+    book_filter: Optional[BookFilter] = None,
+) -> List[Document]:
+    """
+    Etapa 1: Cargar documentos de texto desde el directorio especificado.
+    Soporta archivos con extensiones definidas en 'document_types'.
+    Almacena el contenido de los documentos en una lista para procesamiento posterior.
 
-    print(f"[Text Extraction] Loaded {len(documents)} documents with a total of {len(pages)} pages.")
+    Args:
+        document_types (List[str]): Lista de extensiones de archivo soportadas (ej. ["txt", "md"]).
+        documents_path (str): Ruta al directorio que contiene los documentos.
+        max_workers (Optional[int]): Hilos de lectura (config["max_workers"]).
+        lazy (bool): Cargar solo metadatos; ver iter_text_extraction.
+        page_cache (Optional[PageCache]): Caché LRU de páginas decodificadas para el modo lazy.
+        book_filter (Optional[BookFilter]): Omitir libros para los que devuelve False.
+
+    Returns:
+        List[Document]: Lista de objetos Document con el contenido extraído.
+    """
 
-    return documents
+    return list(
+        iter_text_extraction(
+            document_types,
+            documents_path,
+            max_workers,
+            prefetch=None,
+            lazy=lazy,
+            page_cache=page_cache,
+            book_filter=book_filter,
+        )
+    )
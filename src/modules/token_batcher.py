@@ -0,0 +1,99 @@
+import math
+from typing import List, Optional
+
+# LaTeX is dense in tokens: commands, braces and sub/superscripts split into
+# many pieces, so we assume fewer characters per token than for prose.
+CHARS_PER_TOKEN = 2.5
+# Each formula comes back as its JSON key plus an English description,
+# roughly three times its own size, plus quotes, colon and comma.
+OUTPUT_FACTOR = 3.0
+ITEM_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def item_cost(latex: str) -> int:
+    """Estimated prompt + response tokens one formula adds to a batch."""
+    tokens = estimate_tokens(latex)
+    return tokens + math.ceil(tokens * OUTPUT_FACTOR) + ITEM_OVERHEAD
+
+
+class TokenBatcher:
+    """
+    Packs formulas into LLM batches by estimated token cost instead of a fixed
+    count: a batch is closed when the next formula would push it past
+    target_fill * max_tokens (after the fixed prompt) or past max_items.
+
+    Batches whose response could not be parsed are split and queued again
+    (see retry); the counters give the average fill ratio and retry rate.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_items: Optional[int] = None,
+        prompt_tokens: int = 0,
+        target_fill: float = 0.9,
+    ):
+        self.budget = None
+        if max_tokens is not None:
+            self.budget = max(1, int(max_tokens * target_fill) - prompt_tokens)
+        self.max_items = max_items
+
+        self.batches = 0
+        self.retried = 0
+        self.dropped = 0
+        self._fill_total = 0.0
+
+    def pack(self, items: List[str]) -> List[List[str]]:
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        cost = 0
+        for item in items:
+            item_tokens = item_cost(item)
+            full = self.max_items is not None and len(batch) >= self.max_items
+            over = self.budget is not None and cost + item_tokens > self.budget
+            if batch and (full or over):
+                batches.append(self._close(batch, cost))
+                batch, cost = [], 0
+            batch.append(item)
+            cost += item_tokens
+        if batch:
+            batches.append(self._close(batch, cost))
+        return batches
+
+    def _close(self, batch: List[str], cost: int) -> List[str]:
+        self.batches += 1
+        if self.budget is not None:
+            self._fill_total += cost / self.budget
+        return batch
+
+    def retry(self, batch: List[str], missing: List[str]) -> List[List[str]]:
+        """
+        New batches for the formulas of 'batch' that got no translation:
+        a batch with no usable answer at all (e.g. truncated JSON) is split in
+        half, a partial answer resends only the missing formulas, and a single
+        formula that fails again is dropped.
+        """
+        if not missing:
+            return []
+        if len(missing) == len(batch):
+            if len(batch) == 1:
+                self.dropped += 1
+                return []
+            middle = len(batch) // 2
+            parts = [batch[:middle], batch[middle:]]
+        else:
+            parts = [missing]
+        self.retried += 1
+        return [self._close(part, sum(item_cost(item) for item in part)) for part in parts]
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "fill_ratio": round(self._fill_total / self.batches, 3) if self.budget and self.batches else None,
+            "retry_rate": round(self.retried / self.batches, 3) if self.batches else 0.0,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,114 @@
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional
+
+_DELIMITERS = (("$$", "$$"), ("\\[", "\\]"), ("\\(", "\\)"), ("$", "$"))
+_SPACE_RE = re.compile(r"\s+")
+# whitespace only matters between two word characters (e.g. "\alpha x") or after
+# a backslash (the "\ " control space)
+_REDUNDANT_SPACE_RE = re.compile(r"(?<![A-Za-z0-9\\]) | (?![A-Za-z0-9])")
+
+
+def normalize_latex(latex: str) -> str:
+    """
+    Canonical form of a formula used as cache key: math delimiters removed,
+    whitespace collapsed, and spaces that do not separate two words dropped,
+    so "$x + y$", "x+y" and "\\( x+y \\)" share one entry.
+    """
+    text = latex.strip()
+    for start, end in _DELIMITERS:
+        if len(text) >= len(start) + len(end) and text.startswith(start) and text.endswith(end):
+            text = text[len(start):-len(end)].strip()
+            break
+    text = _SPACE_RE.sub(" ", text)
+    return _REDUNDANT_SPACE_RE.sub("", text)
+
+
+class TranslationCache:
+    """
+    Disk-backed LaTeX -> English cache (SQLite), keyed on the normalized
+    formula, the model name and the prompt version. The least recently used
+    entries are evicted once the cache holds more than max_entries.
+    """
+
+    def __init__(self, path: str, model: str, prompt_version: str, max_entries: int = 200_000):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " model TEXT NOT NULL, prompt_version TEXT NOT NULL, latex TEXT NOT NULL,"
+            " translation TEXT NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, prompt_version, latex)) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)"
+        )
+        self._db.commit()
+
+    def get(self, latex: str) -> Optional[str]:
+        return self.get_many([latex]).get(latex)
+
+    def get_many(self, latex_list: Iterable[str]) -> Dict[str, str]:
+        """Return the cached translations of latex_list, keyed by the given strings."""
+        found: Dict[str, str] = {}
+        keys = {latex: normalize_latex(latex) for latex in latex_list}
+        now = time.time()
+        for latex, key in keys.items():
+            row = self._db.execute(
+                "SELECT translation FROM translations WHERE model = ? AND prompt_version = ? AND latex = ?",
+                (self.model, self.prompt_version, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                continue
+            self.hits += 1
+            found[latex] = row[0]
+            self._db.execute(
+                "UPDATE translations SET last_used = ? WHERE model = ? AND prompt_version = ? AND latex = ?",
+                (now, self.model, self.prompt_version, key),
+            )
+        self._db.commit()
+        return found
+
+    def put_many(self, translations: Dict[str, str]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO translations (model, prompt_version, latex, translation, last_used)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [
+                (self.model, self.prompt_version, normalize_latex(latex), translation, now)
+                for latex, translation in translations.items()
+            ],
+        )
+        self._evict()
+        self._db.commit()
+
+    def _evict(self) -> None:
+        (size,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = size - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM translations WHERE (model, prompt_version, latex) IN ("
+                " SELECT model, prompt_version, latex FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        (size,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+        return size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,387 @@
+"""
+Servidor HTTP local de trabajos para el pipeline (Etapa 8: herramienta web).
+
+Cada trabajo procesa un libro (una carpeta de config["data"]["documents_path"])
+por las etapas 1-6. Los trabajos se encolan y se ejecutan en un pool de
+procesos acotado ("workers"); la configuración y los módulos se cargan una
+sola vez por proceso, no por trabajo.
+
+    POST /jobs               {"book": "<carpeta>"}  -> 202 {"id", "status", ...}
+    GET  /jobs               estado de todos los trabajos
+    GET  /jobs/<id>          estado y eventos de un trabajo
+    GET  /jobs/<id>/events   eventos en vivo (text/event-stream) hasta que termina
+
+Solo se conservan los últimos server.max_finished_jobs trabajos terminados.
+La cabecera Access-Control-Allow-Origin se envía únicamente si se configura
+server.allowed_origin.
+
+Uso (desde la raíz del proyecto, como index.py):
+    python src/server.py [--port 8765] [--workers 2] [--verbose] [--log-json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from modules.content_classification import iter_classify_contents
+from modules.convert_to_json import iter_convert_to_json
+from modules.corpus_store import iter_save_corpus
+from modules.save_contents import iter_save_contents
+from modules.split_contents import iter_split_contents
+from modules.text_extraction import load_document
+from utils import log_event, verbose_print
+
+MAX_BODY = 1 << 16
+STATUS_TEXT = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+FINISHED = ("completed", "failed")
+
+# Set once per worker process by _init_worker
+_worker_config: Optional[dict] = None
+_worker_events = None
+
+
+def _init_worker(config: dict, events) -> None:
+    global _worker_config, _worker_events
+    _worker_config = config
+    _worker_events = events
+
+
+def _emit(job_id: str, stage: str, event: str, **fields) -> None:
+    _worker_events.put((job_id, stage, event, fields))
+
+
+def _run_stage(job_id: str, stage: str, documents) -> list:
+    _emit(job_id, stage, "started")
+    started = time.perf_counter()
+    documents = list(documents)
+    _emit(job_id, stage, "completed", seconds=round(time.perf_counter() - started, 3))
+    return documents
+
+
+def _load_book(config: dict, book: str):
+    # one-book stream for _run_stage: only this book's folder is read
+    yield load_document(
+        config["data"]["extensions"],
+        os.path.join(config["data"]["documents_path"], book),
+        max_workers=config.get("max_workers"),
+    )
+
+
+def run_book(job_id: str, book: str) -> None:
+    """
+    Etapas 1-6 para un libro, en un proceso del pool. El progreso se envía
+    como eventos (job_id, stage, event, fields); el último es
+    ("job", "completed") o ("job", "failed").
+    """
+    config = _worker_config
+    artifacts_path = config["artifacts_path"]
+    try:
+        documents = _run_stage(job_id, "text_extraction", _load_book(config, book))
+        documents = _run_stage(job_id, "split_contents", iter_split_contents(documents))
+        if config.get("classify_contents", False):
+            documents = _run_stage(job_id, "classify_contents", iter_classify_contents(documents))
+        if config.get("artifact_backend", "files") == "corpus":
+            documents = _run_stage(job_id, "save_corpus", iter_save_corpus(documents, artifacts_path))
+        else:
+            documents = _run_stage(job_id, "save_contents", iter_save_contents(
+                documents, artifacts_path, max_workers=config.get("max_workers")
+            ))
+        export = config.get("json_export", {})
+        if export.get("enabled", False):
+            documents = _run_stage(job_id, "convert_to_json", iter_convert_to_json(
+                documents, artifacts_path, export.get("compression", "gzip")
+            ))
+        document = documents[0]
+        _emit(
+            job_id, "job", "completed",
+            pages=len(document.pages), chapters=len(document.chapters), sections=len(document.sections),
+        )
+    except Exception as e:
+        _emit(job_id, "job", "failed", error=repr(e))
+
+
+class Job:
+    __slots__ = ("id", "book", "status", "events", "created", "done", "updated")
+
+    def __init__(self, book: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.book = book
+        self.status = "queued"
+        self.events: List[dict] = []
+        self.created = time.time()
+        self.done = asyncio.Event()
+        # replaced on every event; SSE streams wait on the current one
+        self.updated = asyncio.Event()
+
+    def publish(self, stage: str, event: str, **fields) -> None:
+        record = {"ts": round(time.time(), 3), "job": self.id, "stage": stage, "event": event}
+        record.update(fields)
+        self.events.append(record)
+        if stage == "job":
+            self.status = event
+            if event in FINISHED:
+                self.done.set()
+        log_event(stage, event, job=self.id, book=self.book, **fields)
+        update, self.updated = self.updated, asyncio.Event()
+        update.set()
+
+    def summary(self) -> dict:
+        return {"id": self.id, "book": self.book, "status": self.status, "created": self.created}
+
+
+class JobServer:
+    """
+    asyncio HTTP server with a job queue in front of a process pool of
+    'workers' processes. POST /jobs answers as soon as the job is queued;
+    the stages run in the pool and report progress through a
+    multiprocessing queue that one thread relays to the event loop.
+    Only the 'max_finished_jobs' most recent finished jobs are kept.
+    Responses carry Access-Control-Allow-Origin only when 'allowed_origin'
+    is set.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        workers: int = 2,
+        queue_size: int = 100,
+        max_finished_jobs: int = 100,
+        allowed_origin: Optional[str] = None,
+    ):
+        self.config = config
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_finished_jobs = max_finished_jobs
+        self.allowed_origin = allowed_origin
+        self.jobs: Dict[str, Job] = {}
+        self.port: Optional[int] = None
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._events = None
+        self._relay: Optional[threading.Thread] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        # spawn: the relay thread is already running, and forking a threaded process is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._events = context.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(self.config, self._events),
+        )
+        self._relay = threading.Thread(target=self._relay_events, name="job-events", daemon=True)
+        self._relay.start()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[Job Server] Escuchando en http://{host}:{self.port} con {self.workers} workers")
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._relay.join()
+        self._events.close()
+
+    def _relay_events(self) -> None:
+        # blocking reads of the process queue, handed over to the event loop
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._publish, *item)
+
+    def _publish(self, job_id: str, stage: str, event: str, fields: dict) -> None:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.publish(stage, event, **fields)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                job.publish("job", "running")
+                try:
+                    await self._loop.run_in_executor(self._executor, run_book, job.id, job.book)
+                except Exception as e:  # the worker process died (BrokenProcessPool, ...)
+                    job.publish("job", "failed", error=repr(e))
+                await job.done.wait()
+                self._expire_jobs()
+            finally:
+                self._queue.task_done()
+
+    def _expire_jobs(self) -> None:
+        # jobs is in submission order, so the first finished ones are the oldest
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def submit(self, book: str) -> Job:
+        job = Job(book)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        job.publish("job", "queued", position=self._queue.qsize())
+        return job
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY:
+                await self._respond(writer, 413, {"error": "Cuerpo demasiado grande"})
+                return
+            body = await reader.readexactly(length)
+            verbose_print("[Job Server] %s %s", method, target)
+            await self._route(writer, method, target.split("?", 1)[0].rstrip("/"), body)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self._respond(writer, 400, {"error": "Solicitud HTTP inválida"})
+        except ConnectionError:
+            pass  # client went away
+        finally:
+            writer.close()
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes) -> None:
+        parts = path.strip("/").split("/")
+        if parts[0] != "jobs" or len(parts) > 3 or (len(parts) == 3 and parts[2] != "events"):
+            await self._respond(writer, 404, {"error": f"Ruta desconocida: {path}"})
+        elif len(parts) == 1:
+            if method == "POST":
+                await self._create_job(writer, body)
+            elif method == "GET":
+                await self._respond(writer, 200, {"jobs": [job.summary() for job in self.jobs.values()]})
+            else:
+                await self._respond(writer, 405, {"error": f"Método no permitido: {method}"})
+        elif method != "GET":
+            await self._respond(writer, 405, {"error": f"Método no permitido: {method}"})
+        elif parts[1] not in self.jobs:
+            await self._respond(writer, 404, {"error": f"Trabajo desconocido: {parts[1]}"})
+        elif len(parts) == 2:
+            job = self.jobs[parts[1]]
+            await self._respond(writer, 200, dict(job.summary(), events=job.events))
+        else:
+            await self._stream_events(writer, self.jobs[parts[1]])
+
+    async def _create_job(self, writer: asyncio.StreamWriter, body: bytes) -> None:
+        try:
+            book = json.loads(body or b"{}").get("book")
+        except (json.JSONDecodeError, AttributeError):
+            book = None
+        if not isinstance(book, str) or not book or os.path.basename(book) != book or book in (".", ".."):
+            await self._respond(writer, 400, {"error": 'Se espera {"book": "<nombre de la carpeta del libro>"}'})
+            return
+        if not os.path.isdir(os.path.join(self.config["data"]["documents_path"], book)):
+            await self._respond(writer, 404, {"error": f"Libro no encontrado: {book}"})
+            return
+        for job in self.jobs.values():
+            if job.book == book and job.status not in FINISHED:
+                await self._respond(writer, 409, dict(job.summary(), error="El libro ya está en proceso"))
+                return
+        try:
+            job = self.submit(book)
+        except asyncio.QueueFull:
+            await self._respond(writer, 503, {"error": "Cola de trabajos llena"})
+            return
+        await self._respond(writer, 202, dict(job.summary(), position=self._queue.qsize()))
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, job: Job) -> None:
+        writer.write(
+            "HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            f"{self._cors_header()}Connection: close\r\n\r\n".encode("latin-1")
+        )
+        sent = 0
+        while True:
+            update = job.updated
+            for record in job.events[sent:]:
+                # job status changes (queued, running, completed, failed) or stage "progress"
+                kind = record["event"] if record["stage"] == "job" else "progress"
+                writer.write(f"event: {kind}\ndata: {json.dumps(record, ensure_ascii=False)}\n\n".encode("utf-8"))
+            sent = len(job.events)
+            await writer.drain()
+            if job.done.is_set():
+                return
+            await update.wait()
+
+    def _cors_header(self) -> str:
+        if self.allowed_origin is None:
+            return ""
+        return f"Access-Control-Allow-Origin: {self.allowed_origin}\r\n"
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n{self._cors_header()}Connection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+
+
+async def serve(config: dict, host: str, port: int, workers: int, queue_size: int, **options) -> None:
+    server = JobServer(config, workers=workers, queue_size=queue_size, **options)
+    await server.start(host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--log-json", action="store_true")
+    args = parser.parse_args()
+
+    # La configuración se lee una vez; los procesos del pool la reciben al iniciar
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    os.makedirs(config["artifacts_path"], exist_ok=True)
+    settings = config.get("server", {})
+    try:
+        asyncio.run(serve(
+            config,
+            args.host or settings.get("host", "127.0.0.1"),
+            args.port or settings.get("port", 8765),
+            args.workers or settings.get("workers", 2),
+            settings.get("queue_size", 100),
+            max_finished_jobs=settings.get("max_finished_jobs", 100),
+            allowed_origin=settings.get("allowed_origin"),
+        ))
+    except KeyboardInterrupt:
+        print("[Job Server] Detenido")
+
+
+if __name__ == "__main__":
+    main()
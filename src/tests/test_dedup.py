@@ -0,0 +1,61 @@
+"""
+Duplicates maps a reprint's pages and sections to the canonical copy,
+exposes that mapping through canonical_page/canonical_section, and
+estimates the formulas and LLM requests the duplicates save; the estimate
+survives save_state/load_state. Run from src/:
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("pylatexenc")
+
+from benchmarks.synthetic_corpus import book_page_texts
+from models.document import Document
+from models.page import Page
+from modules.dedup import Duplicates
+from modules.split_contents import split_document
+
+PAGES = book_page_texts(20, formula_rate=0.5, seed=1)
+
+
+def _document(name, texts):
+    document = Document(name=name, path="")
+    document.pages = [Page(parent_document=document, content=text) for text in texts]
+    return split_document(document)
+
+
+def _duplicates():
+    duplicates = Duplicates()
+    duplicates.add_document(_document("original", PAGES))
+    duplicates.add_document(_document("other", book_page_texts(20, formula_rate=0.5, seed=2)))
+    duplicates.add_document(_document("reprint", PAGES))
+    return duplicates
+
+
+def test_reprint_maps_to_the_canonical_copy():
+    duplicates = _duplicates()
+    assert duplicates.canonical_page("reprint", 3) == ("original", 3)
+    assert duplicates.canonical_section("reprint", 0) == ("original", 0)
+    assert duplicates.canonical_page("original", 3) is None
+    assert duplicates.canonical_section("other", 0) is None
+
+
+def test_llm_savings_come_from_duplicate_sections():
+    duplicates = _duplicates()
+    reprint = _document("reprint", PAGES)
+    formulas = sum(
+        record[2] for i, record in enumerate(duplicates.documents["reprint"]["sections"])
+        if ("reprint", i) in duplicates.sections
+    )
+    report = duplicates.report(chunk_size=10)
+    assert formulas > 0 and len(duplicates.sections) == len(reprint.sections)
+    assert report["llm_saved"] == {"formulas": formulas, "calls": -(-formulas // 10)}
+
+
+def test_estimate_survives_the_state_round_trip(tmp_path):
+    duplicates = _duplicates()
+    path = str(tmp_path / "dedup_state.json")
+    duplicates.save_state(path)
+    loaded = Duplicates.load_state(path)
+    assert loaded.report() == duplicates.report()
+    assert loaded.canonical_section("reprint", 0) == ("original", 0)
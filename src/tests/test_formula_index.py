@@ -0,0 +1,48 @@
+"""
+FormulaIndex.add_document gives each occurrence the page its text starts
+on, from the page offsets split_contents records in every section: a
+formula repeated on later pages and a paragraph hyphenated across a page
+break get their own page. Run from src/:
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("pylatexenc")
+
+from models.document import Document
+from models.page import Page
+from modules.formula_index import FormulaIndex
+from modules.latex_verification import iter_section_formulas
+from modules.split_contents import _attach_split, _compact_split, split_document
+
+PAGES = [
+    "## Chapter\n# Section\nFirst $x^2$ and $y$ here.\n",
+    "More about $x^2$ on the second page, then a hyphen-\n",
+    "ated word and $z$ with $x^2$ again.\n\n$y$ closes it.\n",
+]
+
+
+def _document():
+    document = Document(name="book", path="")
+    document.pages = [Page(parent_document=document, content=text) for text in PAGES]
+    return document
+
+
+def _pages(document):
+    index = FormulaIndex()
+    index.add_document(document, iter_section_formulas(document))
+    return {latex: [posting.page for posting in index.occurrences(latex)] for latex in ("x^2", "y", "z")}
+
+
+def test_each_occurrence_gets_its_own_page():
+    document = split_document(_document())
+    assert _pages(document) == {"x^2": [0, 1, 2], "y": [0, 2], "z": [2]}
+
+
+def test_page_starts_survive_the_worker_round_trip():
+    document = split_document(_document())
+    rebuilt = _attach_split(_document(), _compact_split(document))
+    assert [offset for offset, _ in rebuilt.sections[0].page_starts] == [
+        offset for offset, _ in document.sections[0].page_starts
+    ]
+    assert _pages(rebuilt) == _pages(document)
@@ -0,0 +1,69 @@
+"""
+The regex fast path of extract_page_latex must find the same math and macro
+spans as the LatexWalker path. Run from src/:
+    python -m pytest tests
+"""
+import pytest
+
+pytest.importorskip("pylatexenc")
+
+from benchmarks.synthetic_corpus import book_page_texts
+from modules.latex_verification import _regex_spans, extract_page_latex
+
+NESTED_DOLLAR_PAGES = [
+    r"x $a \text{if $b$}$ y",
+    r"$$a \mbox{for $n$ even}$$ and $c$",
+    r"Let $f(x) = 1 \text{ when $x > 0$}$ hold, then $g$.",
+    "$a \\text{if $b$}$\n\nmore text $x^2$ here",
+]
+PLAIN_PAGES = [
+    r"$a$ and $b$",
+    r"$\frac{a}{b}$ \textbf{x}",
+    r"$a \text{b}$ and \(c\) and \[d\]",
+    r"a price of \$5 and $x$",
+]
+MACRO_PAGES = [
+    r"\textbf{bold $b$} and $c$",
+    r"$\alpha{}$ and $\alpha {} \beta$",
+    r"a\,b, \$5, line\\ next\\[2pt] and \{x\}",
+    r"$\frac {a} {b}$ and $\frac12 + \hat x + \sqrt[3]{y}$",
+    "\\section*{Intro} \\alpha\n\\beta \\foo{a}{b}",
+]
+COMMENT_PAGES = [
+    r"$a$ % \alpha $x$",
+    r"\textbf{a} 50\% of $b$ % $c$",
+]
+
+
+def _spans(text, fast):
+    return [
+        (f.kind, f.delimiter, f.start, f.end, f.line, f.column, f.latex)
+        for f in extract_page_latex(0, 0, text, fast=fast)
+    ]
+
+
+@pytest.mark.parametrize("text", NESTED_DOLLAR_PAGES)
+def test_nested_dollar_falls_back_to_walker(text):
+    assert _regex_spans(text) is None
+    assert _spans(text, fast=True) == _spans(text, fast=False)
+
+
+def test_nested_dollar_is_one_formula():
+    assert [f[-1] for f in _spans(r"x $a \text{if $b$}$ y", fast=True) if f[0] == "math"] == [r"a \text{if $b$}"]
+
+
+@pytest.mark.parametrize("text", PLAIN_PAGES + MACRO_PAGES)
+def test_regex_path_matches_walker(text):
+    assert _regex_spans(text) is not None
+    assert _spans(text, fast=True) == _spans(text, fast=False)
+
+
+def test_synthetic_pages_match_walker():
+    for text in book_page_texts(50, formula_rate=0.5, seed=3):
+        assert _spans(text, fast=True) == _spans(text, fast=False)
+
+
+@pytest.mark.parametrize("text", COMMENT_PAGES)
+def test_comments_fall_back_to_walker(text):
+    assert _regex_spans(text) is None
+    assert _spans(text, fast=True) == _spans(text, fast=False)
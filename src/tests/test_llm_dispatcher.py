@@ -0,0 +1,144 @@
+"""
+LLMDispatcher against a local fake Ollama server (POST /api/chat): requests
+run concurrently up to the limit, transient failures (5xx, timeouts) are
+retried, other error answers are not, and the connection pool of a run is
+closed at its end. Run from src/:
+    python -m pytest tests
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from modules.latex_to_natural import make_dispatcher
+from modules.llm_dispatcher import LLMDispatcher
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """
+    Answers with the user message upper-cased. The model name picks the
+    behaviour: "slow" waits 0.5 s, "flaky" fails its first two requests with
+    503, "missing" answers 404 as Ollama does for an unknown model.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            flaky_failure = body["model"] == "flaky" and server.requests <= 2
+        try:
+            time.sleep(0.5 if body["model"] == "slow" else 0.05)
+            if body["model"] == "missing":
+                self._send(404, {"error": f"model '{body['model']}' not found"})
+            elif flaky_failure:
+                self._send(503, {"error": "server busy"})
+            else:
+                content = body["messages"][-1]["content"].upper()
+                self._send(200, {
+                    "model": body["model"], "created_at": "2024-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content}, "done": True,
+                })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.requests = httpd.in_flight = httpd.max_in_flight = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _dispatcher(server, model="fake", **options):
+    config = {"model": model, "host": f"http://127.0.0.1:{server.server_address[1]}", "concurrency": 3, "timeout": 5}
+    config.update(options)
+    dispatcher = make_dispatcher(config)
+    dispatcher.backoff = 0.01
+    return dispatcher
+
+
+def _requests(count):
+    return [[{"role": "user", "content": f"formula {i}"}] for i in range(count)]
+
+
+def test_requests_run_concurrently_up_to_the_limit(server):
+    dispatcher = _dispatcher(server)
+    started = time.perf_counter()
+    texts = dispatcher.run_sync(_requests(9))
+    elapsed = time.perf_counter() - started
+    assert texts == [f"FORMULA {i}" for i in range(9)]
+    assert server.max_in_flight == 3
+    # three waves of 0.05 s, not nine
+    assert elapsed < 9 * 0.05
+    assert dispatcher.stats() == {"requests": 9, "retries": 0, "failures": 0}
+
+
+def test_server_errors_are_retried(server):
+    dispatcher = _dispatcher(server, model="flaky", concurrency=1)
+    assert dispatcher.run_sync(_requests(1)) == ["FORMULA 0"]
+    assert dispatcher.stats() == {"requests": 3, "retries": 2, "failures": 0}
+
+
+def test_client_errors_are_not_retried(server):
+    dispatcher = _dispatcher(server, model="missing")
+    assert dispatcher.run_sync(_requests(2)) == [None, None]
+    assert server.requests == 2
+    assert dispatcher.stats() == {"requests": 2, "retries": 0, "failures": 2}
+
+
+def test_timeouts_are_retried_then_given_up(server):
+    dispatcher = _dispatcher(server, model="slow", timeout=0.1, max_retries=1)
+    assert dispatcher.run_sync(_requests(1)) == [None]
+    assert dispatcher.stats() == {"requests": 2, "retries": 1, "failures": 1}
+
+
+def test_the_connection_pool_is_closed_after_each_run(server):
+    dispatcher = _dispatcher(server)
+    clients = []
+    make_client = dispatcher._make_client
+
+    def tracked():
+        clients.append(make_client())
+        return clients[-1]
+
+    dispatcher._make_client = tracked
+    dispatcher.run_sync(_requests(2))
+    dispatcher.run_sync(_requests(2))
+    assert len(clients) == 2
+    assert all(client._client.is_closed for client in clients)
+
+
+def test_a_given_client_is_left_open():
+    class Stub:
+        async def chat(self, model, messages, options=None):
+            return {"message": {"content": " ok "}}
+
+    dispatcher = LLMDispatcher(model="stub", client=Stub())
+    assert dispatcher.run_sync(_requests(2)) == ["ok", "ok"]
@@ -0,0 +1,64 @@
+"""
+latex_to_natural with a token budget packs batches by estimated cost
+instead of a fixed count, and splits a batch whose answer does not parse.
+Run from src/:
+    python -m pytest tests
+"""
+import json
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from modules.latex_to_natural import build_messages, latex_to_natural, make_dispatcher
+from modules.token_batcher import TokenBatcher, estimate_tokens, item_cost
+
+SHORT = [f"x_{i}" for i in range(40)]
+LONG = [r"\sum_{k=0}^{n} \binom{n}{k} a^{k} b^{n-k} + " * 4 + str(i) for i in range(10)]
+
+
+class StubClient:
+    """Answers every formula of a batch; batches longer than 'max_formulas' get an answer that does not parse."""
+
+    def __init__(self, max_formulas=None):
+        self.max_formulas = max_formulas
+        self.batches = []
+
+    async def chat(self, model, messages, options=None):
+        formulas = messages[-1]["content"].split("Now translate the following symbols:\n", 1)[1].splitlines()
+        self.batches.append(formulas)
+        answer = json.dumps({latex: f"english {latex}" for latex in formulas})[1:-1]
+        if self.max_formulas is not None and len(formulas) > self.max_formulas:
+            answer = "I ran out of tokens"
+        return {"message": {"content": answer}}
+
+
+def test_batches_stay_within_the_budget():
+    budget = 1500
+    prompt = estimate_tokens(build_messages([])[-1]["content"])
+    batcher = TokenBatcher(max_tokens=budget, max_items=500, prompt_tokens=prompt)
+    batches = batcher.pack(SHORT + LONG)
+    assert len(batches) > 1
+    assert [latex for batch in batches for latex in batch] == SHORT + LONG
+    for batch in batches:
+        assert prompt + sum(item_cost(latex) for latex in batch) <= budget
+    assert 0 < batcher.metrics()["fill_ratio"] <= 1
+
+
+def test_token_budget_reaches_the_batches():
+    client = StubClient()
+    result = latex_to_natural(LONG, dispatcher=make_dispatcher({"model": "stub"}, client=client), token_budget=600)
+    assert len(result) == len(LONG)
+    assert len(client.batches) > 1
+
+    client = StubClient()
+    latex_to_natural(LONG, dispatcher=make_dispatcher({"model": "stub"}, client=client))
+    assert len(client.batches) == 1
+
+
+def test_unparsed_batches_are_split_and_resent():
+    client = StubClient(max_formulas=5)
+    result = latex_to_natural(SHORT[:20], dispatcher=make_dispatcher({"model": "stub"}, client=client))
+    assert len(result) == 20
+    # 20 -> 10 + 10 -> 5 + 5 + 5 + 5
+    assert [len(batch) for batch in client.batches] == [20, 10, 10, 5, 5, 5, 5]
@@ -0,0 +1,86 @@
+"""
+latex_to_natural with a TranslationCache must send each formula to the
+model once: a second run over the same formulas, with the cache reopened
+from disk, makes no LLM calls. Run from src/:
+    python -m pytest tests
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("ollama")
+
+from modules.latex_to_natural import PROMPT_VERSION, latex_to_natural, make_dispatcher
+from modules import translation_cache
+from modules.translation_cache import TranslationCache
+
+FORMULAS = [r"\alpha", r"\sum_{i=1}^n x_i", r"x + y", r"\frac{a}{b}"]
+
+
+class StubClient:
+    """Stands in for ollama.AsyncClient: answers every formula of the prompt with 'english <formula>'."""
+
+    def __init__(self):
+        self.calls = 0
+        self.sent = []
+
+    async def chat(self, model, messages, options=None):
+        self.calls += 1
+        formulas = messages[-1]["content"].split("Now translate the following symbols:\n", 1)[1].splitlines()
+        self.sent.extend(formulas)
+        answer = json.dumps({latex: f"english {latex}" for latex in formulas})
+        return {"message": {"content": answer[1:-1]}}
+
+
+def _cache(path, max_entries=100):
+    return TranslationCache(str(path), "stub", PROMPT_VERSION, max_entries)
+
+
+def _dispatcher(client):
+    return make_dispatcher({"model": "stub"}, client=client)
+
+
+def test_second_run_makes_no_llm_calls(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    client = StubClient()
+    cache = _cache(path)
+    first = latex_to_natural(FORMULAS, cache=cache, dispatcher=_dispatcher(client))
+    assert client.calls == 1
+    assert sorted(client.sent) == sorted(FORMULAS)
+    assert cache.stats() == {"hits": 0, "misses": len(FORMULAS), "size": len(FORMULAS)}
+    cache.close()
+
+    client = StubClient()
+    cache = _cache(path)
+    second = latex_to_natural(FORMULAS, cache=cache, dispatcher=_dispatcher(client))
+    assert client.calls == 0
+    assert second == first
+    assert cache.stats() == {"hits": len(FORMULAS), "misses": 0, "size": len(FORMULAS)}
+    cache.close()
+
+
+def test_only_new_formulas_are_sent(tmp_path):
+    cache = _cache(tmp_path / "cache.sqlite")
+    latex_to_natural(FORMULAS[:2], cache=cache, dispatcher=_dispatcher(StubClient()))
+
+    client = StubClient()
+    result = latex_to_natural([FORMULAS[0], "$x+y$", "x + y", FORMULAS[3]], cache=cache, dispatcher=_dispatcher(client))
+    # \alpha comes from the cache; "$x+y$" and "x + y" normalize alike and are sent once
+    assert client.calls == 1
+    assert sorted(client.sent) == sorted(["$x+y$", FORMULAS[3]])
+    assert result["$x+y$"] == result["x + y"]
+    assert len(result) == 4
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(translation_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache = _cache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.put_many({"a": "A"})
+    cache.put_many({"b": "B"})
+    cache.get("a")
+    cache.put_many({"c": "C"})
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
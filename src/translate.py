@@ -1,14 +1,18 @@
-from ollama import Client 
-import time
+import json
 
-# Configuration
-LLM_NAME = "gemma3:12b"
-CHUNK_SIZE = 500  # Adjust as needed based on line length
+from modules.latex_to_natural import make_dispatcher, parse_response
+from modules.symbol_dictionary import SymbolDictionary
+from modules.token_batcher import TokenBatcher, estimate_tokens
+from modules.translation_cache import TranslationCache, normalize_latex
+
+# Configuration: model, host, concurrency, timeout, retries and token budget come from config["llm"]
+config = json.load(open("config.json", "r"))
+# Bump when format_for_prompt changes; kept apart from latex_to_natural's prompt in the cache
+PROMPT_VERSION = "translate-1"
+CHUNK_SIZE = 500  # Upper bound of symbols per request
 INPUT_FILE = "SYMLIST"
 OUTPUT_FILE = "latex_symbols_english.txt"
-
-# Connect to your Ollama server (replace with your actual host/port if needed)
-client = Client(host='http://10.252.1.2:11435')
+WELL_KNOWN_FILE = "well-known-latex.json"  # symbols translated without the LLM
 
 def read_chunks(file_path, chunk_size):
     """Yield chunks of lines from a file."""
@@ -31,23 +35,50 @@ def format_for_prompt(chunk):
     prompt = ( "Translate the following LaTeX symbols into plain English. Do not add extra explanation to what the symbols are. You are solely translating formulas into plain English. These are part of a borader context, so do not break continuity" "Return a JSON object mapping symbols to English descriptions, " "without surrounding curly braces at the very start or end.\n\n" f"{symbols_text}" )
     return prompt
 
-def process_chunk(chunk):
-    prompt = format_for_prompt(chunk)
-    response = client.generate(model=LLM_NAME, prompt=prompt)
-    print(response["response"])
-    return response.text.strip()
-
 def main():
+    dispatcher = make_dispatcher(config["llm"])
+    batcher = TokenBatcher(
+        max_tokens=config["llm"].get("maxTokens"),
+        max_items=CHUNK_SIZE,
+        prompt_tokens=estimate_tokens(format_for_prompt([])),
+    )
+    symbols = [symbol for chunk in read_chunks(INPUT_FILE, CHUNK_SIZE) for symbol in chunk]
+    dictionary = SymbolDictionary.load([WELL_KNOWN_FILE])
+    _, symbols = dictionary.split(symbols)
+    print(f"Dictionary stats: {dictionary.stats()}")
+    # symbols translated by an earlier run are written from the cache, not sent again
+    cache = TranslationCache(config["llm"]["cache_path"], dispatcher.model, PROMPT_VERSION, config["llm"]["cache_max_entries"])
+    cached = cache.get_many(symbols)
+    queue = batcher.pack([symbol for symbol in symbols if symbol not in cached])
+
+    # One JSON object per answered chunk; chunks whose answer does not parse
+    # (usually truncated) are split and sent again
     with open(OUTPUT_FILE, "w", encoding="utf-8") as out_file:
-        for i, chunk in enumerate(read_chunks(INPUT_FILE, CHUNK_SIZE), start=1):
-            print(f"Processing chunk {i} ({len(chunk)} symbols)...")
-            try:
-                englishified = process_chunk(chunk)
-                out_file.write(englishified + "\n")
-                out_file.flush()
-            except Exception as e:
-                print(f"Error processing chunk {i}: {e}")
-                time.sleep(5)  # retry delay
+        if cached:
+            out_file.write(json.dumps(cached, ensure_ascii=False) + "\n")
+        while queue:
+            print(f"Processing {len(queue)} chunks, {dispatcher.concurrency} at a time...")
+            responses = dispatcher.run_sync(
+                [[{"role": "user", "content": format_for_prompt(chunk)}] for chunk in queue]
+            )
+            retry_queue = []
+            for i, (chunk, englishified) in enumerate(zip(queue, responses), start=1):
+                if englishified is None:
+                    print(f"Error processing chunk {i}: no response from the model")
+                    continue
+                parsed = parse_response(englishified)
+                if parsed:
+                    out_file.write(json.dumps(parsed, ensure_ascii=False) + "\n")
+                    out_file.flush()
+                answered = {normalize_latex(symbol): english for symbol, english in parsed.items()}
+                cache.put_many({symbol: answered[normalize_latex(symbol)] for symbol in chunk if normalize_latex(symbol) in answered})
+                missing = [symbol for symbol in chunk if normalize_latex(symbol) not in answered]
+                retry_queue.extend(batcher.retry(chunk, missing))
+            queue = retry_queue
+    print(f"Batch stats: {batcher.metrics()}")
+    print(f"Dispatcher stats: {dispatcher.stats()}")
+    print(f"Cache stats: {cache.stats()}")
+    cache.close()
     print("Processing complete. Results saved to:", OUTPUT_FILE)
 
 if __name__ == "__main__":
@@ -1,5 +1,42 @@
+import json
 import sys
+import time
 
-def verbose_print(message):
-    if "--verbose" in sys.argv:
-        print(f"\033[90m{message}\033[0m")
+# Resolved once at import instead of scanning sys.argv on every call
+VERBOSE = "--verbose" in sys.argv
+JSON_LOGS = "--log-json" in sys.argv
+
+
+def set_verbose(enabled: bool):
+    global VERBOSE
+    VERBOSE = enabled
+
+
+def set_json_logs(enabled: bool):
+    global JSON_LOGS
+    JSON_LOGS = enabled
+
+
+def verbose_print(message, *args):
+    """
+    Print a grey detail line when --verbose is on. Arguments are %-formatted
+    into the message only if it is printed, so disabled calls cost one check:
+        verbose_print("[Stage] Loaded %s pages from %s", count, name)
+    """
+    if not VERBOSE:
+        return
+    if args:
+        message = message % args
+    print(f"\033[90m{message}\033[0m")
+
+
+def log_event(stage: str, event: str, **fields):
+    """
+    Emit one JSON line on stderr for the log shipper when --log-json is on,
+    e.g. {"ts": ..., "stage": "split_contents", "event": "completed", "documents": 12}
+    """
+    if not JSON_LOGS:
+        return
+    record = {"ts": round(time.time(), 3), "stage": stage, "event": event}
+    record.update(fields)
+    print(json.dumps(record, ensure_ascii=False, default=str), file=sys.stderr, flush=True)